@@ -0,0 +1,322 @@
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+class WordConverter:
+    """
+    以 Word COM 轉換，每個 worker 執行緒各自擁有一個 Word 程序
+
+    必須在使用它的執行緒中建立與關閉 (COM 的 apartment 限制)。
+    """
+    def __init__(self):
+        import pythoncom
+        import win32com.client
+
+        pythoncom.CoInitialize()
+        self._pythoncom = pythoncom
+        # DispatchEx 一定會啟動新的 Word 程序，不與其他 worker 共用
+        self.word = win32com.client.DispatchEx("Word.Application")
+        self.word.Visible = False  # 確保 Word 完全隱藏，不顯示任何視窗
+        self.word.DisplayAlerts = 0  # 禁止顯示任何警告訊息
+        self.pid = self._find_pid()
+
+    def _find_pid(self):
+        """以唯一的視窗標題找出這個 Word 程序，供卡住時強制結束"""
+        try:
+            import win32con
+            import win32gui
+            import win32process
+
+            caption = f"Word2PDF-{os.getpid()}-{id(self)}"
+            self.word.Caption = caption
+            hwnd = win32gui.FindWindow("OpusApp", caption)
+            if not hwnd:
+                return None
+            # 隱藏任務欄圖標
+            win32gui.ShowWindow(hwnd, win32con.SW_HIDE)
+            return win32process.GetWindowThreadProcessId(hwnd)[1]
+        except Exception:
+            return None
+
+    def convert(self, docx_path, pdf_path):
+        # 打開文檔時使用 ReadOnly 參數，不加入最近使用的檔案
+        doc = self.word.Documents.Open(
+            docx_path,
+            ReadOnly=True,
+            Visible=False,
+            AddToRecentFiles=False
+        )
+        try:
+            doc.SaveAs(pdf_path, FileFormat=17)
+        finally:
+            doc.Close(SaveChanges=False)
+
+    def kill(self):
+        """從其他執行緒強制結束卡住的 Word 程序"""
+        if self.pid:
+            try:
+                os.kill(self.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def close(self):
+        try:
+            self.word.Quit()
+        except Exception:
+            pass
+        self._pythoncom.CoUninitialize()
+
+def find_soffice():
+    """尋找 LibreOffice 的 soffice 執行檔，找不到時回傳 None"""
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    if sys.platform == "win32":
+        for base in (os.environ.get("ProgramFiles"), os.environ.get("ProgramFiles(x86)")):
+            if base:
+                path = os.path.join(base, "LibreOffice", "program", "soffice.exe")
+                if os.path.exists(path):
+                    return path
+    return None
+
+class LibreOfficeConverter:
+    """
+    以 LibreOffice headless 轉換
+
+    每個 worker 使用自己的使用者設定檔 (-env:UserInstallation)，多個 soffice
+    才能同時執行；設定檔只在第一次啟動時建立，之後的文件沿用，啟動較快。
+
+    Args:
+        soffice (str, optional): soffice 執行檔路徑，預設自動尋找
+    """
+    def __init__(self, soffice=None):
+        self.soffice = soffice or find_soffice()
+        if not self.soffice:
+            raise RuntimeError("找不到 LibreOffice (soffice)")
+        self.work_dir = tempfile.mkdtemp(prefix="word2pdf_lo_")
+        self.profile_url = Path(self.work_dir, "profile").as_uri()
+        self.out_dir = os.path.join(self.work_dir, "out")
+        os.makedirs(self.out_dir)
+        self._process = None
+
+    def convert(self, docx_path, pdf_path):
+        # 先輸出到 worker 自己的資料夾，避免不同 worker 的同名檔案互相覆蓋
+        self._process = subprocess.Popen(
+            [self.soffice, f"-env:UserInstallation={self.profile_url}", "--headless",
+             "--norestore", "--convert-to", "pdf", "--outdir", self.out_dir, docx_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # soffice 會再啟動 soffice.bin，放在獨立的行程群組才能一起結束
+            start_new_session=sys.platform != "win32"
+        )
+        _, stderr = self._process.communicate()
+        returncode = self._process.returncode
+        self._process = None
+
+        converted = os.path.join(self.out_dir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+        if returncode != 0 or not os.path.exists(converted):
+            raise RuntimeError(f"soffice 結束代碼 {returncode}: {stderr.decode(errors='replace').strip()}")
+        shutil.move(converted, pdf_path)
+
+    def kill(self):
+        """從其他執行緒強制結束卡住的 soffice"""
+        process = self._process
+        if process is None:
+            return
+        if sys.platform == "win32":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        else:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def close(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+# 可用的轉換後端：名稱 -> 建立轉換器的類別
+BACKENDS = {
+    "word": WordConverter,
+    "libreoffice": LibreOfficeConverter,
+}
+
+def default_backend():
+    """Windows 且有安裝 pywin32 時使用 Word，否則使用 LibreOffice"""
+    if sys.platform == "win32":
+        try:
+            import win32com.client  # noqa: F401
+            return "word"
+        except ImportError:
+            pass
+    return "libreoffice"
+
+class _Worker(threading.Thread):
+    """持有一個轉換器的 worker 執行緒，轉換 max_jobs 份文件後重新建立轉換器"""
+    def __init__(self, pool):
+        super().__init__(daemon=True)
+        self.pool = pool
+        self.converter = None
+        self.current = None  # (工作, 開始時間)
+        self.abandoned = False
+        self.lock = threading.Lock()
+
+    def _close_converter(self):
+        if self.converter is not None:
+            try:
+                self.converter.close()
+            except Exception:
+                pass
+            self.converter = None
+
+    def run(self):
+        done = 0
+        try:
+            while True:
+                job = self.pool._jobs.get()
+                if job is None:
+                    break
+                with self.lock:
+                    self.current = (job, time.monotonic())
+                error = None
+                try:
+                    if self.converter is None:
+                        self.converter = self.pool.factory()
+                    self.converter.convert(*job)
+                except Exception as e:
+                    error = e
+                with self.lock:
+                    if self.abandoned:
+                        # 已被判定卡住並由新的 worker 取代，結果已回報
+                        break
+                    self.current = None
+                self.pool._results.put((job, error))
+
+                done += 1
+                if error is not None or done >= self.pool.max_jobs:
+                    # 定期回收，避免長時間執行的應用程式累積記憶體或進入異常狀態
+                    self._close_converter()
+                    done = 0
+        finally:
+            self._close_converter()
+
+class ConverterPool:
+    """
+    常駐的 Word 轉 PDF 轉換器池
+
+    N 個 worker 執行緒各自保持一個已啟動的應用程式，從佇列取得工作；
+    每轉換 max_jobs 份文件 (或發生錯誤) 後重新啟動應用程式，
+    單份文件超過 timeout 秒未完成時強制結束該應用程式，並以新的 worker 取代。
+
+    Args:
+        backend (str): "word"、"libreoffice" 或 "auto"
+        workers (int): worker 數
+        max_jobs (int): 每個應用程式實例轉換幾份文件後回收
+        timeout (float): 單份文件的轉換時間上限 (秒)
+    """
+    def __init__(self, backend="auto", workers=2, max_jobs=50, timeout=120):
+        if backend == "auto":
+            backend = default_backend()
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的轉換後端: {backend}，可用: {', '.join(BACKENDS)}")
+        self.backend = backend
+        self.factory = BACKENDS[backend]
+        self.workers = max(1, workers)
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._threads = []
+        self._abandoned = []
+
+    def _start_worker(self):
+        worker = _Worker(self)
+        self._threads.append(worker)
+        worker.start()
+
+    def _check_hangs(self):
+        """找出超過時間上限的 worker，強制結束其應用程式並回報逾時"""
+        now = time.monotonic()
+        for worker in list(self._threads):
+            with worker.lock:
+                if worker.current is None or now - worker.current[1] <= self.timeout:
+                    continue
+                job = worker.current[0]
+                worker.current = None
+                worker.abandoned = True
+            self._threads.remove(worker)
+            self._abandoned.append(worker)
+            converter = worker.converter
+            if converter is not None:
+                converter.kill()
+            self._results.put((job, TimeoutError(f"轉換超過 {self.timeout} 秒")))
+            self._start_worker()
+
+    def imap(self, jobs, stop_check=None):
+        """
+        轉換多份文件，依完成順序產生結果
+
+        Args:
+            jobs (list): [(docx 路徑, pdf 路徑), ...]
+            stop_check (callable, optional): 回傳 True 時不再開始新的工作
+
+        Yields:
+            tuple: (docx 路徑, pdf 路徑, 例外或 None)
+        """
+        jobs = list(jobs)
+        while len(self._threads) < min(self.workers, len(jobs)):
+            self._start_worker()
+        for job in jobs:
+            self._jobs.put(job)
+
+        remaining = len(jobs)
+        while remaining:
+            if stop_check and stop_check():
+                self._cancel_pending()
+                return
+            # 每次都檢查，其他 worker 持續完成工作時卡住的實例也會在時限後被結束
+            self._check_hangs()
+            try:
+                job, error = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            remaining -= 1
+            yield job[0], job[1], error
+
+    def _cancel_pending(self):
+        """移除佇列中尚未開始的工作"""
+        while True:
+            try:
+                self._jobs.get_nowait()
+            except queue.Empty:
+                return
+
+    def close(self):
+        """等待進行中的文件完成並關閉所有應用程式"""
+        self._cancel_pending()
+        for _ in self._threads:
+            self._jobs.put(None)
+        for worker in self._threads:
+            worker.join(self.timeout)
+            converter = worker.converter
+            if worker.is_alive() and converter is not None:
+                converter.kill()
+                self._abandoned.append(worker)
+        # 被強制結束的 worker 會自行清理，稍候讓它完成
+        for worker in self._abandoned:
+            worker.join(5)
+        self._threads = []
+        self._abandoned = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
\ No newline at end of file
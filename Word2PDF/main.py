@@ -1,12 +1,10 @@
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import win32com.client
-import win32gui
-import win32con
 import threading
 from pathlib import Path
 import sys
+from converter_pool import ConverterPool
 
 # 設置程式圖標
 def resource_path(relative_path):
@@ -30,71 +28,50 @@ def count_docx_files(root_folder):
                 count += 1
     return count
 
-def convert_docx_to_pdf_custom(root_folder, output_folder, log_callback, progress_callback, stop_check):
+def iter_docx_jobs(root_folder, output_folder):
+    """列出所有要轉換的 (docx 路徑, pdf 路徑)，並建立輸出資料夾"""
+    for foldername, _, filenames in os.walk(root_folder):
+        for filename in filenames:
+            if filename.endswith(".docx") and not filename.startswith("~$"):
+                docx_path = os.path.abspath(os.path.join(foldername, filename))
+                rel_path = os.path.relpath(foldername, root_folder)
+                top_level_folder = rel_path.split(os.sep)[0] if rel_path != "." else ""
+                output_subfolder = os.path.join(output_folder, top_level_folder)
+                os.makedirs(output_subfolder, exist_ok=True)
+                pdf_name = os.path.splitext(filename)[0] + ".pdf"
+                yield docx_path, os.path.abspath(os.path.join(output_subfolder, pdf_name))
+
+def convert_docx_to_pdf_custom(root_folder, output_folder, log_callback, progress_callback, stop_check,
+                               workers=None, backend="auto", max_jobs=50, timeout=120):
+    """
+    以轉換器池平行轉換資料夾中的所有 Word 檔
+
+    Args:
+        workers (int, optional): 同時執行的 Word / LibreOffice 實例數，預設為核心數的一半 (最多 4)
+        backend (str): "word"、"libreoffice" 或 "auto"
+        max_jobs (int): 每個實例轉換幾份文件後重新啟動
+        timeout (float): 單份文件的轉換時間上限 (秒)，超過時強制結束該實例
+    """
     global processed_files
     processed_files = 0
-    
-    # 啟動 Word 應用程式並完全隱藏
-    word = win32com.client.Dispatch("Word.Application")
-    word.Visible = False  # 確保 Word 完全隱藏，不顯示任何視窗
-    word.DisplayAlerts = 0  # 禁止顯示任何警告訊息
-    
-    # 設置 Word 窗口狀態為最小化
-    if hasattr(word, 'WindowState'):
-        word.WindowState = 2  # 2 = wdWindowStateMinimize
-    
-    # 隱藏任務欄圖標
-    try:
-        # 嘗試找到並隱藏 Word 的主窗口
-        hwnd = win32gui.FindWindow("OpusApp", None)
-        if hwnd:
-            win32gui.ShowWindow(hwnd, win32con.SW_HIDE)
-    except:
-        pass
-    
-    try:
-        for foldername, _, filenames in os.walk(root_folder):
-            for filename in filenames:
-                # 檢查是否應該停止進程
-                if stop_check():
-                    log_callback("⚠️ 轉換過程已被用戶停止")
-                    return
-                    
-                if filename.endswith(".docx") and not filename.startswith("~$"):
-                    docx_path = os.path.abspath(os.path.join(foldername, filename))
-                    rel_path = os.path.relpath(foldername, root_folder)
-                    top_level_folder = rel_path.split(os.sep)[0] if rel_path != "." else ""
-                    output_subfolder = os.path.join(output_folder, top_level_folder)
-                    os.makedirs(output_subfolder, exist_ok=True)
-                    pdf_name = os.path.splitext(filename)[0] + ".pdf"
-                    pdf_path = os.path.join(output_subfolder, pdf_name)
-                    try:
-                        # 打開文檔時使用 ReadOnly 和 NoEnvelopeVis 參數
-                        doc = word.Documents.Open(
-                            docx_path, 
-                            ReadOnly=True,
-                            Visible=False,
-                            AddToRecentFiles=False
-                        )
-                        # 如果有文檔窗口，也嘗試隱藏它
-                        if hasattr(doc, 'ActiveWindow') and doc.ActiveWindow is not None:
-                            doc.ActiveWindow.Visible = False
-                            
-                        doc.SaveAs(pdf_path, FileFormat=17)
-                        doc.Close(SaveChanges=False)
-                        processed_files += 1
-                        progress_callback(processed_files)
-                        log_callback(f"✅ {docx_path} → {pdf_path}")
-                    except Exception as e:
-                        log_callback(f"❌ 無法轉換 {docx_path}，原因：{e}")
-    finally:
-        # 確保無論如何都關閉 Word
-        try:
-            word.Quit()
-        except:
-            pass
-            
-    if not stop_check():  # 只有在正常完成時才顯示完成訊息
+
+    if workers is None:
+        workers = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+    jobs = list(iter_docx_jobs(root_folder, output_folder))
+    with ConverterPool(backend, workers=workers, max_jobs=max_jobs, timeout=timeout) as pool:
+        log_callback(f"使用 {pool.backend}，{min(pool.workers, len(jobs))} 個轉換程序")
+        for docx_path, pdf_path, error in pool.imap(jobs, stop_check):
+            if error is not None:
+                log_callback(f"❌ 無法轉換 {docx_path}，原因：{error}")
+                continue
+            processed_files += 1
+            progress_callback(processed_files)
+            log_callback(f"✅ {docx_path} → {pdf_path}")
+
+    if stop_check():
+        log_callback("⚠️ 轉換過程已被用戶停止")
+    else:  # 只有在正常完成時才顯示完成訊息
         log_callback("🎉 所有 Word 檔轉 PDF 完成！")
 
 def browse_folder(entry, is_output=False):
@@ -1,20 +1,198 @@
 import os
+import json
+import hashlib
 import fitz  # PyMuPDF
-from PIL import Image
 from glob import glob
+from image_pipeline import iter_prepared_images
+from render_cache import file_hash
 
-def combine_to_pdf(input_folder, output_pdf, image_types=("*.jpg", "*.jpeg", "*.png"), include_pdf=True):
+# 紙張大小 (寬, 高)，單位為點 (1/72 英吋)
+PAGE_SIZES = {
+    "a4": (595, 842),
+    "letter": (612, 792),
+}
+
+def _image_page_rect(prepared, page_size):
+    """
+    計算圖片頁面的大小
+    
+    page_size 為紙張名稱時使用固定的直式紙張，圖片等比例置中；
+    為 "fit" 時頁面與圖片 (旋轉後) 同比例，長邊與 A4 長邊相同。
+    """
+    if page_size != "fit":
+        width, height = PAGE_SIZES[page_size]
+        return fitz.Rect(0, 0, width, height)
+    
+    width, height = prepared.width, prepared.height
+    if prepared.rotate in (90, 270):
+        width, height = height, width
+    scale = max(PAGE_SIZES["a4"]) / max(width, height)
+    return fitz.Rect(0, 0, width * scale, height * scale)
+
+def _max_image_size(page_size, target_dpi):
+    """以目標 DPI 換算圖片在頁面上的最大像素 (寬, 高)，不限制時回傳 None"""
+    if not target_dpi:
+        return None
+    if page_size == "fit":
+        # 長邊固定，短邊隨圖片比例變化，兩個方向都以長邊為上限
+        width = height = max(PAGE_SIZES["a4"])
+    else:
+        width, height = PAGE_SIZES[page_size]
+    return (int(width * target_dpi / 72), int(height * target_dpi / 72))
+
+def _state_path(output_pdf):
+    """增量合併狀態檔的路徑 (與輸出 PDF 放在一起)"""
+    return output_pdf + ".inputs.json"
+
+def _input_record(path, digest=None):
+    """記錄輸入檔的路徑、修改時間、大小與內容雜湊"""
+    stat = os.stat(path)
+    return {
+        "path": os.path.abspath(path),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "hash": digest or file_hash(path),
+    }
+
+def _output_stamp(output_pdf):
+    stat = os.stat(output_pdf)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def load_merge_state(output_pdf, options):
+    """
+    讀取增量合併狀態
+    
+    Args:
+        output_pdf (str): 輸出 PDF 檔案的路徑
+        options (dict): 本次合併的選項，必須與上次相同
+    
+    Returns:
+        dict: 合併狀態；不存在、選項不同或輸出檔已被其他程式修改時回傳 None
+    """
+    try:
+        with open(_state_path(output_pdf), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != 1 or state.get("options") != options:
+            return None
+        if _output_stamp(output_pdf) != state["output"]:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return state
+    
+def _merged_inputs(state):
+    """
+    確認上次已合併的輸入檔都未變更
+    
+    Returns:
+        dict: 絕對路徑 -> 輸入記錄；有檔案被刪除或內容改變時回傳 None
+    """
+    merged = {}
+    for record in state["inputs"]:
+        path = record["path"]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_mtime_ns != record["mtime_ns"] or stat.st_size != record["size"]:
+            # 只有修改時間不同 (例如重新複製) 時，以雜湊確認內容是否相同
+            if file_hash(path) != record["hash"]:
+                return None
+            record = _input_record(path, record["hash"])
+        merged[path] = record
+    return merged
+    
+def _add_images(pdf_output, image_files, image_xrefs, page_size, target_dpi, quality, workers):
+    """
+    將圖片逐張加入為新頁面
+    
+    Args:
+        image_xrefs (dict): 已插入的圖片 (內容雜湊 -> xref)，相同內容的圖片只嵌入一次
+    
+    Returns:
+        list: 成功加入的圖片路徑
+    """
+    added = []
+    
+    # 圖片在背景平行讀取與正規化 (EXIF 方向、透明背景)，依檔名順序插入
+    # 需要重新編碼時 JPEG 維持 JPEG，其他格式以無損 PNG 編碼
+    max_size = _max_image_size(page_size, target_dpi)
+    for prepared in iter_prepared_images(image_files, workers=workers, max_size=max_size,
+                                         quality=quality, fmt="auto"):
+        if isinstance(prepared, tuple):
+            img_path, error = prepared
+            print(f"處理圖片 {img_path} 時發生錯誤: {error}")
+            continue
+        img_path = prepared.path
+        page = None
+        try:
+            digest = hashlib.sha256(prepared.data).hexdigest()
+            
+            rect = _image_page_rect(prepared, page_size)
+            
+            # 直接在輸出文件創建新頁面
+            page = pdf_output.new_page(width=rect.width, height=rect.height)
+            
+            # 插入圖片：JPEG / JPX 資料由 PyMuPDF 原樣嵌入，不重新壓縮
+            if digest in image_xrefs:
+                page.insert_image(rect, xref=image_xrefs[digest], rotate=prepared.rotate)
+            else:
+                alpha = 0 if prepared.fmt == "jpeg" else -1
+                image_xrefs[digest] = page.insert_image(rect, stream=prepared.data, alpha=alpha,
+                                                        rotate=prepared.rotate)
+            added.append(img_path)
+            print(f"已加入圖片: {os.path.basename(img_path)}")
+        except Exception as e:
+            # 插入失敗時移除剛建立的空白頁
+            if page is not None:
+                pdf_output.delete_page(page.number)
+            print(f"處理圖片 {img_path} 時發生錯誤: {e}")
+    return added
+    
+def _add_pdfs(pdf_output, pdf_files):
+    """
+    將 PDF 檔案的所有頁面加入輸出文件
+    
+    Returns:
+        list: 成功加入的 PDF 路徑
+    """
+    added = []
+    for pdf_path in pdf_files:
+        try:
+            # 開啟 PDF 檔案
+            pdf_doc = fitz.open(pdf_path)
+            
+            # 將整個 PDF 加入輸出文件
+            pdf_output.insert_pdf(pdf_doc)
+            added.append(pdf_path)
+            print(f"已加入 PDF ({pdf_doc.page_count} 頁): {os.path.basename(pdf_path)}")
+            pdf_doc.close()
+        except Exception as e:
+            print(f"處理 PDF {pdf_path} 時發生錯誤: {e}")
+    return added
+
+def combine_to_pdf(input_folder, output_pdf, image_types=("*.jpg", "*.jpeg", "*.png"), include_pdf=True,
+                   workers=None, page_size="a4", target_dpi=None, quality=75, incremental=False):
     """
     將資料夾中的圖片和 PDF 檔案合併為單一 PDF 檔案
     
+    增量模式會在輸出檔旁記錄已合併的輸入 (路徑、修改時間、雜湊)，之後只把新檔案
+    以增量儲存附加到輸出檔末端；已合併的檔案被刪除或修改、選項改變，或輸出檔
+    被其他程式修改時，自動改為完整重建。
+    
     Args:
         input_folder (str): 輸入檔案所在資料夾路徑
         output_pdf (str): 輸出 PDF 檔案的路徑
         image_types (tuple): 要包含的圖片類型
         include_pdf (bool): 是否包含資料夾中的 PDF 檔案
+        workers (int, optional): 解碼 / 轉換圖片的程序數，None 或 1 表示依序處理，0 表示使用所有核心
+        page_size (str): 圖片頁面大小，"a4"、"letter" 或依圖片比例的 "fit"
+        target_dpi (int, optional): 圖片在頁面上的有效解析度上限，超過時先縮小再嵌入
+        quality (int): 縮小後的 JPEG 圖片重新編碼時的品質
+        incremental (bool): 只附加上次合併後新增的檔案
     """
-    # 建立新的 PDF 文件
-    pdf_output = fitz.open()
+    if page_size != "fit" and page_size not in PAGE_SIZES:
+        raise ValueError(f"不支援的頁面大小: {page_size}")
     
     # 處理所有圖片檔案
     image_files = []
@@ -25,61 +203,95 @@ def combine_to_pdf(input_folder, output_pdf, image_types=("*.jpg", "*.jpeg", "*.
     # 排序圖片檔案
     image_files.sort()
     
-    # 加入圖片到 PDF
-    for img_path in image_files:
-        try:
-            # 使用 PyMuPDF 插入圖片
-            img_doc = fitz.open()
-            rect = fitz.Rect(0, 0, 595, 842)  # A4 大小
-            
-            # 創建新頁面
-            page = img_doc.new_page(width=rect.width, height=rect.height)
-            
-            # 插入圖片
-            page.insert_image(rect, filename=img_path)
-            
-            # 將頁面加入輸出 PDF
-            pdf_output.insert_pdf(img_doc)
-            print(f"已加入圖片: {os.path.basename(img_path)}")
-        except Exception as e:
-            print(f"處理圖片 {img_path} 時發生錯誤: {e}")
-    
-    # 處理 PDF 檔案
+    # 處理 PDF 檔案，避免處理輸出檔案本身
+    pdf_files = []
     if include_pdf:
-        pdf_files = glob(os.path.join(input_folder, "*.pdf"))
-        pdf_files.sort()
+        pdf_files = sorted(
+            pdf_path for pdf_path in glob(os.path.join(input_folder, "*.pdf"))
+            if os.path.abspath(pdf_path) != os.path.abspath(output_pdf)
+        )
         
-        for pdf_path in pdf_files:
-            # 避免處理輸出檔案本身
-            if os.path.abspath(pdf_path) == os.path.abspath(output_pdf):
-                continue
+    # 影響輸出內容的選項，改變時不能沿用上次的結果
+    options = {
+        "image_types": list(image_types),
+        "include_pdf": include_pdf,
+        "page_size": page_size,
+        "target_dpi": target_dpi,
+        "quality": quality,
+    }
             
-            try:
-                # 開啟 PDF 檔案
-                pdf_doc = fitz.open(pdf_path)
+    merged = None
+    pdf_output = None
+    if incremental and os.path.exists(output_pdf):
+        state = load_merge_state(output_pdf, options)
+        merged = _merged_inputs(state) if state is not None else None
+        if merged is None:
+            print("合併記錄與目前檔案不一致，重新建立完整 PDF")
+        else:
+            new_images = [p for p in image_files if os.path.abspath(p) not in merged]
+            new_pdfs = [p for p in pdf_files if os.path.abspath(p) not in merged]
+            if not new_images and not new_pdfs:
+                print(f"沒有新的檔案需要合併: {output_pdf}")
+                return
+            pdf_output = fitz.open(output_pdf)
+            if pdf_output.can_save_incrementally():
+                image_files, pdf_files = new_images, new_pdfs
+                image_xrefs = dict(state["images"])
+            else:
+                print("輸出檔無法增量儲存，重新建立完整 PDF")
+                pdf_output.close()
+                pdf_output = None
                 
-                # 將整個 PDF 加入輸出文件
-                pdf_output.insert_pdf(pdf_doc)
-                print(f"已加入 PDF ({pdf_doc.page_count} 頁): {os.path.basename(pdf_path)}")
-            except Exception as e:
-                print(f"處理 PDF {pdf_path} 時發生錯誤: {e}")
-    
-    # 儲存合併後的 PDF
-    if pdf_output.page_count > 0:
-        pdf_output.save(output_pdf)
+    appending = pdf_output is not None
+    if not appending:
+        # 建立新的 PDF 文件
+        pdf_output = fitz.open()
+        merged = {}
+        image_xrefs = {}
+    
+    # 加入圖片與 PDF 到輸出文件
+    added = _add_images(pdf_output, image_files, image_xrefs, page_size, target_dpi, quality, workers)
+    added += _add_pdfs(pdf_output, pdf_files)
+    
+    # 儲存合併後的 PDF；增量模式只在檔案末端寫入新增的物件
+    # PNG 等非 JPEG 圖片以未壓縮的像素插入，儲存時需要 deflate
+    saved = False
+    if appending and added:
+        pdf_output.save(output_pdf, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP, deflate=True)
+        print(f"\n已附加 {len(added)} 個檔案，共 {pdf_output.page_count} 頁: {output_pdf}")
+        saved = True
+    elif not appending and pdf_output.page_count > 0:
+        # 增量模式記錄的圖片 xref 必須在儲存後仍然有效：garbage=1 只移除未使用的物件，
+        # 不會重新編號或合併物件
+        pdf_output.save(output_pdf, garbage=1 if incremental else 3, deflate=True)
         print(f"\n成功將 {pdf_output.page_count} 頁合併為 PDF: {output_pdf}")
-    else:
+        saved = True
+    elif not appending:
         print(f"沒有找到任何檔案可以合併")
     
     # 關閉 PDF 文件
     pdf_output.close()
+    
+    # 記錄已合併的輸入，供下次增量合併使用
+    if incremental and saved:
+        for path in added:
+            merged[os.path.abspath(path)] = _input_record(path)
+        state = {
+            "version": 1,
+            "options": options,
+            "output": _output_stamp(output_pdf),
+            "inputs": list(merged.values()),
+            "images": image_xrefs,
+        }
+        with open(_state_path(output_pdf), "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
 
 if __name__ == "__main__":
     # 輸入檔案所在資料夾
-    input_folder = r"C:\Users\"
+    input_folder = r"C:\Users"
     
     # 輸出 PDF 檔案路徑
-    output_pdf = r"C:\Users\"
+    output_pdf = r"C:\Users"
     
     # 執行合併
     combine_to_pdf(input_folder, output_pdf)
\ No newline at end of file
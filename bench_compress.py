@@ -0,0 +1,53 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import fitz  # PyMuPDF
+from compress import compress_pdf_safe
+
+def make_sample_pdf(path, page_count):
+    """建立含文字與共用圖片的測試 PDF（未壓縮）"""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 300, 300), False)
+    pix.set_rect(pix.irect, (200, 60, 60))
+    image_data = pix.tobytes("png")
+    
+    doc = fitz.open()
+    image_xref = 0
+    for i in range(page_count):
+        page = doc.new_page(width=595, height=842)
+        for row in range(30):
+            page.insert_text((50, 60 + row * 18), f"Page {i+1} line {row+1} " * 4, fontsize=9)
+        image_xref = page.insert_image(fitz.Rect(150, 600, 450, 800), stream=image_data, xref=image_xref)
+    doc.save(path)
+    doc.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="compress_pdf_safe 直接儲存與逐頁重建效能比較")
+    parser.add_argument("pdf", nargs="?", help="測試用 PDF（預設自動產生）")
+    parser.add_argument("--pages", type=int, default=1000, help="自動產生的頁數")
+    parser.add_argument("--level", default="high", choices=("low", "medium", "high"))
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="bench_compress_")
+    try:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(work_dir, "sample.pdf")
+            make_sample_pdf(pdf_path, args.pages)
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+        
+        print(f"來源: {page_count} 頁，{os.path.getsize(pdf_path) / 1024:.1f} KB，壓縮等級: {args.level}")
+        print(f"{'方式':<10} {'秒數':>8} {'輸出大小 (KB)':>14}")
+        for name, rebuild in (("rebuild", True), ("direct", False)):
+            output_path = os.path.join(work_dir, f"{name}.pdf")
+            start = time.perf_counter()
+            compress_pdf_safe(pdf_path, output_path, args.level, verbose=False, rebuild=rebuild)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<10} {elapsed:>8.2f} {os.path.getsize(output_path) / 1024:>14.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
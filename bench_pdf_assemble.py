@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import fitz  # PyMuPDF
+from pdf_assemble import save_pages
+
+def make_sample_pdf(path, page_count):
+    """建立每頁共用同一張圖片與字型的測試 PDF"""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 400, 400), False)
+    pix.set_rect(pix.irect, (30, 120, 200))
+    image_data = pix.tobytes("png")
+    
+    doc = fitz.open()
+    image_xref = 0
+    for i in range(page_count):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 60), f"Page {i+1}", fontsize=24, fontname="helv")
+        image_xref = page.insert_image(fitz.Rect(100, 100, 500, 500), stream=image_data,
+                                       xref=image_xref)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+def per_page_loop(pdf_path, page_order, output_path):
+    """原本 save_pdf 的做法：每頁呼叫一次 insert_pdf"""
+    source = fitz.open(pdf_path)
+    new_pdf = fitz.open()
+    for page_idx in page_order:
+        new_pdf.insert_pdf(source, from_page=page_idx, to_page=page_idx)
+    new_pdf.save(output_path)
+    new_pdf.close()
+    source.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="頁面組合方式效能比較")
+    parser.add_argument("pdf", nargs="?", help="測試用 PDF（預設自動產生）")
+    parser.add_argument("--pages", type=int, default=1500, help="自動產生的頁數")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="bench_pdf_assemble_")
+    try:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(work_dir, "sample.pdf")
+            make_sample_pdf(pdf_path, args.pages)
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+        
+        # 模擬使用者調整順序：打亂後刪除約 5% 的頁面
+        page_order = list(range(page_count))
+        random.Random(0).shuffle(page_order)
+        page_order = page_order[:max(1, int(page_count * 0.95))]
+        
+        methods = [
+            ("per-page", lambda out: per_page_loop(pdf_path, page_order, out)),
+            ("select", lambda out: save_pages(pdf_path, page_order, out, method="select")),
+            ("graft", lambda out: save_pages(pdf_path, page_order, out, method="graft")),
+        ]
+        print(f"來源: {page_count} 頁，輸出: {len(page_order)} 頁")
+        print(f"{'方式':<10} {'秒數':>8} {'輸出大小 (KB)':>14}")
+        for name, run in methods:
+            output_path = os.path.join(work_dir, f"{name}.pdf")
+            start = time.perf_counter()
+            run(output_path)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<10} {elapsed:>8.2f} {os.path.getsize(output_path) / 1024:>14.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import fitz  # PyMuPDF
+from pdf_to_jpg import convert_pdf_to_jpg
+
+def make_sample_pdf(path, page_count):
+    """建立含文字與向量圖形的測試 PDF"""
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page(width=595, height=842)
+        for row in range(40):
+            page.insert_text((50, 60 + row * 18), f"Page {i+1} line {row+1} " * 4, fontsize=9)
+        for k in range(30):
+            page.draw_circle((300, 420), 20 + k * 8, color=(k / 30, 0.2, 1 - k / 30))
+    doc.save(path)
+    doc.close()
+
+def worker_counts(max_workers):
+    """產生 1, 2, 4, ... 直到 max_workers 的 worker 數量"""
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="pdf_to_jpg 多程序轉換效能測試")
+    parser.add_argument("pdf", nargs="?", help="測試用 PDF（預設自動產生）")
+    parser.add_argument("--pages", type=int, default=64, help="自動產生的頁數")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_pdf_to_jpg_")
+    try:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(work_dir, "sample.pdf")
+            make_sample_pdf(pdf_path, args.pages)
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+
+        print(f"{'workers':>8} {'秒數':>8} {'頁/秒':>8} {'加速':>6}")
+        baseline = None
+        for workers in worker_counts(args.max_workers):
+            output_folder = os.path.join(work_dir, f"out_{workers}")
+            start = time.perf_counter()
+            # 隱藏逐頁輸出，避免影響計時
+            with contextlib.redirect_stdout(io.StringIO()):
+                convert_pdf_to_jpg(pdf_path, output_folder, workers=workers)
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline = elapsed
+            print(f"{workers:>8} {elapsed:>8.2f} {page_count / elapsed:>8.1f} {baseline / elapsed:>5.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,195 @@
 import os
+import zlib
+import hashlib
 import fitz  # PyMuPDF
 import time
+import multiprocessing
+from multiprocessing.connection import wait
+from glob import glob
+from PIL import Image
+from image_encoder import encode_image, pixmap_to_image
+from pdf_io import describe, is_path, open_document, save_document, source_size
 
-def compress_pdf_safe(input_pdf, output_pdf=None, compression_level="medium"):
+# 各等級預設的圖片最佳化參數 (目標 DPI, JPEG 品質)
+IMAGE_DEFAULTS = {
+    "extreme": (150, 75),
+}
+
+def image_display_dpi(pdf_document, pages=None):
+    """
+    計算每張圖片在所有頁面上最高需求的有效解析度
+    
+    Args:
+        pdf_document (fitz.Document): PDF 文件
+        pages (list, optional): 只檢查這些頁碼 (從 0 開始)，預設為所有頁面
+    
+    Returns:
+        dict: xref -> 顯示最大處的 DPI (以面積換算，與旋轉無關)
+    """
+    dpi = {}
+    for page_num in range(pdf_document.page_count) if pages is None else pages:
+        page = pdf_document[page_num]
+        for info in page.get_image_info(xrefs=True):
+            xref = info["xref"]
+            bbox = fitz.Rect(info["bbox"])
+            # 內嵌圖片 (xref 為 0) 或不可見的圖片不處理
+            if xref == 0 or bbox.is_empty:
+                continue
+            area_dpi = ((info["width"] * info["height"]) / (bbox.width * bbox.height)) ** 0.5 * 72
+            dpi[xref] = min(dpi.get(xref, area_dpi), area_dpi)
+    return dpi
+
+def is_optimizable_image(pdf_document, xref):
+    """有透明遮罩、本身為遮罩或已是 1 位元的圖片不重新壓縮"""
+    return not (pdf_document.xref_get_key(xref, "SMask")[0] != "null"
+                or pdf_document.xref_get_key(xref, "Mask")[0] != "null"
+                or pdf_document.xref_get_key(xref, "ImageMask")[1] == "true"
+                or pdf_document.xref_get_key(xref, "BitsPerComponent")[1] == "1")
+
+def _is_bilevel(gray_image, tolerance=0.05):
+    """灰階圖片幾乎只有黑白兩色 (例如文字掃描) 時回傳 True"""
+    histogram = gray_image.histogram()
+    midtones = sum(histogram[32:224])
+    return midtones <= tolerance * gray_image.width * gray_image.height
+
+def _rewrite_image(pdf_document, xref, data, width, height, colorspace, bits, filter_name):
+    """以新的資料取代圖片串流，xref 不變，所有引用該圖片的頁面都會更新"""
+    pdf_document.update_stream(xref, data, compress=False)
+    pdf_document.xref_set_key(xref, "Width", str(width))
+    pdf_document.xref_set_key(xref, "Height", str(height))
+    pdf_document.xref_set_key(xref, "ColorSpace", colorspace)
+    pdf_document.xref_set_key(xref, "BitsPerComponent", str(bits))
+    pdf_document.xref_set_key(xref, "Filter", filter_name)
+    for key in ("DecodeParms", "Decode"):
+        pdf_document.xref_set_key(xref, key, "null")
+
+def _encode_optimized(pix, display_dpi, target_dpi, jpeg_quality, bilevel):
+    """
+    將圖片縮小到目標 DPI 並重新編碼
+    
+    Returns:
+        tuple: (資料, 寬, 高, 色彩空間, 位元數, 濾鏡)
+    """
+    if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+        # CMYK、Lab 等轉為 RGB
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    image = pixmap_to_image(pix)
+    # 縮小會產生灰階邊緣，黑白判斷需在縮小前進行
+    bilevel = bilevel and image.mode == "L" and _is_bilevel(image)
+    
+    if display_dpi > target_dpi:
+        scale = target_dpi / display_dpi
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+    
+    if bilevel:
+        # 黑白圖片以 1 位元無損壓縮，比 JPEG 小且沒有壓縮雜訊
+        mono = image.point(lambda v: 255 if v >= 128 else 0).convert("1")
+        return (zlib.compress(mono.tobytes(), 9), mono.width, mono.height,
+                "/DeviceGray", 1, "/FlateDecode")
+    
+    colorspace = "/DeviceGray" if image.mode == "L" else "/DeviceRGB"
+    data = encode_image(image, fmt="jpg", quality=jpeg_quality, optimize=True)
+    return data, image.width, image.height, colorspace, 8, "/DCTDecode"
+
+def optimize_images(pdf_document, target_dpi=150, jpeg_quality=75, bilevel=True, verbose=False):
+    """
+    重新壓縮與縮小 PDF 內的圖片
+    
+    依每張圖片在頁面上的顯示大小計算有效 DPI，超過 target_dpi 的縮小後重新編碼為
+    JPEG；黑白掃描圖片改為 1 位元圖片。內容相同的圖片只處理一次，儲存時以
+    garbage=4 合併。結果不比原始串流小時保留原圖。有透明遮罩或本身為遮罩的圖片不處理。
+    
+    Args:
+        pdf_document (fitz.Document): 要修改的文件
+        target_dpi (int): 目標有效解析度
+        jpeg_quality (int): JPEG 品質
+        bilevel (bool): 是否將黑白圖片轉為 1 位元
+        verbose (bool): 是否輸出處理進度
+    
+    Returns:
+        dict: replaced (已取代)、duplicates (重複圖片)、skipped (略過) 的數量
+    """
+    stats = {"replaced": 0, "duplicates": 0, "skipped": 0}
+    # 原始串流雜湊 -> (原始大小, [xref, ...])
+    groups = {}
+    
+    display_dpi = image_display_dpi(pdf_document)
+    for xref in sorted(display_dpi):
+        if not is_optimizable_image(pdf_document, xref):
+            stats["skipped"] += 1
+            continue
+        
+        raw = pdf_document.xref_stream_raw(xref)
+        digest = hashlib.sha256(raw).hexdigest()
+        groups.setdefault(digest, (len(raw), []))[1].append(xref)
+        
+    for raw_size, xrefs in groups.values():
+        stats["duplicates"] += len(xrefs) - 1
+        # 內容相同的圖片只編碼一次，以顯示最大 (DPI 最低) 的副本決定縮小比例
+        group_dpi = min(display_dpi[xref] for xref in xrefs)
+        xref = xrefs[0]
+        is_jpeg = "DCTDecode" in pdf_document.xref_get_key(xref, "Filter")[1]
+        needs_resize = group_dpi > target_dpi * 1.1
+        result = None
+        # 已是 JPEG 且不需縮小時不重新編碼，避免畫質再次損失
+        if needs_resize or not is_jpeg:
+            try:
+                pix = fitz.Pixmap(pdf_document, xref)
+                result = _encode_optimized(pix, group_dpi, target_dpi, jpeg_quality, bilevel)
+                if len(result[0]) >= raw_size:
+                    result = None
+            except Exception as e:
+                if verbose:
+                    print(f"無法處理圖片 xref {xref}: {e}")
+        
+        if result is None:
+            stats["skipped"] += len(xrefs)
+            continue
+        for xref in xrefs:
+            _rewrite_image(pdf_document, xref, *result)
+            stats["replaced"] += 1
+            if verbose:
+                print(f"已最佳化圖片 xref {xref} ({group_dpi:.0f} dpi)")
+    return stats
+
+def compress_pdf_safe(input_pdf, output_pdf=None, compression_level="medium", verbose=True, rebuild=False,
+                      target_dpi=None, jpeg_quality=None):
     """
     使用更安全的方式壓縮 PDF 檔案
     
+    預設直接以壓縮參數儲存開啟的文件；只有指定 rebuild，或 PyMuPDF 開啟時
+    必須修復損壞的 xref 時，才逐頁複製到新文件後再儲存。
+    "extreme" 等級或指定 target_dpi / jpeg_quality 時，另外縮小並重新壓縮圖片。
+    
+    輸入也可以是記憶體中的 PDF，輸出可以是串流或直接回傳 bytes，不經過暫存檔。
+    
     Args:
-        input_pdf (str): 輸入 PDF 檔案路徑
-        output_pdf (str, optional): 輸出 PDF 檔案路徑
-        compression_level (str): 壓縮等級，可選 "low", "medium", "high"
+        input_pdf (str | bytes | memoryview | mmap | file | fitz.Document): 輸入 PDF 檔案路徑、
+            記憶體中的 PDF 或已開啟的文件 (圖片最佳化會就地修改，但不會關閉它)
+        output_pdf (str | file, optional): 輸出 PDF 檔案路徑或可寫入的串流；
+            未指定時，路徑輸入自動命名，記憶體輸入回傳 bytes
+        compression_level (str): 壓縮等級，可選 "low", "medium", "high", "extreme"
+        verbose (bool): 是否輸出處理進度
+        rebuild (bool): 強制逐頁重建文件
+        target_dpi (int, optional): 圖片目標解析度 (extreme 預設 150)
+        jpeg_quality (int, optional): 圖片重新編碼的 JPEG 品質 (extreme 預設 75)
+    
+    Returns:
+        tuple: (輸出路徑、串流或 bytes, 原始大小, 壓縮後大小)
     """
     # 如果沒有指定輸出路徑，自動生成
-    if output_pdf is None:
+    if output_pdf is None and is_path(input_pdf):
         file_name, file_ext = os.path.splitext(input_pdf)
         output_pdf = f"{file_name}_compressed{file_ext}"
     
     # 獲取原始檔案大小
-    original_size = os.path.getsize(input_pdf)
+    original_size = source_size(input_pdf)
     original_size_mb = original_size / (1024 * 1024)
     
-    print(f"開始壓縮 PDF: {input_pdf}")
-    print(f"原始檔案大小: {original_size_mb:.2f} MB")
+    if verbose:
+        print(f"開始壓縮 PDF: {describe(input_pdf)}")
+        print(f"原始檔案大小: {original_size_mb:.2f} MB")
     
     # 設定壓縮參數
     if compression_level == "low":
@@ -38,7 +206,7 @@ def compress_pdf_safe(input_pdf, output_pdf=None, compression_level="medium"):
             "clean": True,
             "pretty": False,
         }
-    elif compression_level == "high":
+    elif compression_level in ("high", "extreme"):
         compress_params = {
             "deflate": True,
             "deflate_images": True,
@@ -48,43 +216,205 @@ def compress_pdf_safe(input_pdf, output_pdf=None, compression_level="medium"):
             "pretty": False,
         }
     else:
-        raise ValueError("壓縮等級必須是 'low', 'medium' 或 'high'")
+        raise ValueError("壓縮等級必須是 'low', 'medium', 'high' 或 'extreme'")
+    
+    # 圖片最佳化參數：明確指定的值優先，其次為等級預設值
+    default_dpi, default_quality = IMAGE_DEFAULTS.get(compression_level, (None, None))
+    optimize = compression_level in IMAGE_DEFAULTS or target_dpi is not None or jpeg_quality is not None
+    target_dpi = target_dpi or default_dpi or 150
+    jpeg_quality = jpeg_quality or default_quality or 75
     
     start_time = time.time()
     
-    # 開啟 PDF 檔案
-    pdf_document = fitz.open(input_pdf)
+    # 開啟 PDF 檔案 (記憶體資料不複製、不寫入暫存檔)
+    pdf_document = open_document(input_pdf)
+    
+    if rebuild or pdf_document.is_repaired:
+        if verbose and pdf_document.is_repaired:
+            print("PDF 結構已損壞，逐頁重建文件")
+    
+        # 建立新的 PDF 文件來存放壓縮後的內容
+        new_pdf = fitz.open()
     
-    # 建立新的 PDF 文件來存放壓縮後的內容
-    new_pdf = fitz.open()
+        # 逐頁複製到新文件
+        for page_num in range(len(pdf_document)):
+            # 從原始 PDF 複製頁面到新 PDF
+            new_pdf.insert_pdf(pdf_document, from_page=page_num, to_page=page_num)
+            if verbose:
+                print(f"已處理頁面 {page_num + 1}/{len(pdf_document)}")
+        
+        if pdf_document is not input_pdf:
+            pdf_document.close()
+        pdf_document = new_pdf
     
-    # 逐頁複製到新文件
-    for page_num in range(len(pdf_document)):
-        # 從原始 PDF 複製頁面到新 PDF
-        new_pdf.insert_pdf(pdf_document, from_page=page_num, to_page=page_num)
-        print(f"已處理頁面 {page_num + 1}/{len(pdf_document)}")
+    if optimize:
+        stats = optimize_images(pdf_document, target_dpi, jpeg_quality, verbose=verbose)
+        if verbose:
+            print(f"圖片最佳化: 取代 {stats['replaced']} 張，重複 {stats['duplicates']} 張，略過 {stats['skipped']} 張")
     
-    # 保存壓縮後的 PDF
-    new_pdf.save(output_pdf, **compress_params)
+    # 輸出到輸入檔本身時，先寫到同一資料夾的暫存檔，關閉文件後再取代原檔
+    in_place = (is_path(output_pdf) and bool(pdf_document.name) and os.path.exists(output_pdf)
+                and os.path.samefile(output_pdf, pdf_document.name))
+    save_target = f"{output_pdf}.{os.getpid()}.tmp" if in_place else output_pdf
     
-    # 關閉文件
-    pdf_document.close()
-    new_pdf.close()
+    # 保存壓縮後的 PDF；直接儲存時 garbage / deflate 已會清除未使用的物件並重新壓縮串流
+    try:
+        output_pdf_result, compressed_size = save_document(pdf_document, save_target, **compress_params)
+    except Exception:
+        if in_place and os.path.exists(save_target):
+            os.remove(save_target)
+        raise
+    finally:
+        # 關閉文件 (只關閉這裡開啟的文件)
+        if pdf_document is not input_pdf:
+            pdf_document.close()
+    
+    if in_place:
+        os.replace(save_target, output_pdf)
+    else:
+        output_pdf = output_pdf_result
     
     # 獲取壓縮後的檔案大小
-    compressed_size = os.path.getsize(output_pdf)
     compressed_size_mb = compressed_size / (1024 * 1024)
     compression_ratio = (1 - compressed_size / original_size) * 100
     
-    print(f"\n壓縮完成！")
-    print(f"原始檔案大小: {original_size_mb:.2f} MB")
-    print(f"壓縮後大小: {compressed_size_mb:.2f} MB")
-    print(f"壓縮率: {compression_ratio:.2f}%")
-    print(f"耗時: {time.time() - start_time:.2f} 秒")
-    print(f"輸出檔案: {output_pdf}")
+    if verbose:
+        print(f"\n壓縮完成！")
+        print(f"原始檔案大小: {original_size_mb:.2f} MB")
+        print(f"壓縮後大小: {compressed_size_mb:.2f} MB")
+        print(f"壓縮率: {compression_ratio:.2f}%")
+        print(f"耗時: {time.time() - start_time:.2f} 秒")
+        if is_path(output_pdf):
+            print(f"輸出檔案: {output_pdf}")
     
     return output_pdf, original_size, compressed_size
 
+def _compress_worker(conn, input_pdf, output_pdf, compression_level, image_options):
+    """在子程序中壓縮單一檔案，並透過 conn 回傳結果"""
+    try:
+        _, original_size, compressed_size = compress_pdf_safe(
+            input_pdf, output_pdf, compression_level, verbose=False, **image_options
+        )
+        conn.send(("ok", original_size, compressed_size, None))
+    except Exception as e:
+        conn.send(("error", None, None, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+def _batch_inputs(inputs):
+    """inputs 可為資料夾 (取其中的 *.pdf) 或檔案路徑清單"""
+    if isinstance(inputs, str):
+        if os.path.isdir(inputs):
+            return sorted(glob(os.path.join(inputs, "*.pdf")))
+        return [inputs]
+    return list(inputs)
+
+def _batch_output(input_pdf, output_dir, suffix):
+    file_name, file_ext = os.path.splitext(os.path.basename(input_pdf))
+    folder = output_dir if output_dir is not None else os.path.dirname(input_pdf)
+    return os.path.join(folder, f"{file_name}{suffix}{file_ext}")
+
+def compress_batch(inputs, output_dir=None, compression_level="medium", workers=None, timeout=300,
+                   suffix="_compressed", progress_callback=None, target_dpi=None, jpeg_quality=None):
+    """
+    平行壓縮多個 PDF 檔案
+    
+    每個檔案在獨立的子程序中壓縮，同時執行的子程序數不超過 workers；
+    單一檔案失敗或損壞不影響其他檔案，超過 timeout 的子程序會被終止並刪除未完成的輸出。
+    
+    Args:
+        inputs (str | list): 輸入資料夾 (處理其中的 *.pdf) 或 PDF 路徑清單
+        output_dir (str, optional): 輸出資料夾 (預設: 與輸入檔相同資料夾)
+        compression_level (str): 壓縮等級，可選 "low", "medium", "high", "extreme"
+        workers (int, optional): 同時執行的程序數 (預設: CPU 核心數)
+        timeout (float, optional): 單一檔案的逾時秒數，None 表示不限制
+        suffix (str): 輸出檔名附加的字尾
+        progress_callback (callable, optional): 每完成一個檔案呼叫一次 callback(result)
+        target_dpi (int, optional): 圖片目標解析度，見 compress_pdf_safe
+        jpeg_quality (int, optional): 圖片重新編碼的 JPEG 品質，見 compress_pdf_safe
+    
+    Returns:
+        list: 依輸入順序的結果 dict，包含 input、output、status ("ok"/"error"/"timeout")、
+              original_size、compressed_size、ratio (壓縮後 / 原始)、elapsed (秒)、error
+    """
+    input_files = _batch_inputs(inputs)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    image_options = {"target_dpi": target_dpi, "jpeg_quality": jpeg_quality}
+    
+    results = [None] * len(input_files)
+    pending = list(enumerate(input_files))
+    pending.reverse()
+    # conn -> (索引, 子程序, 開始時間)
+    running = {}
+    
+    def finish(index, status, original_size=None, compressed_size=None, error=None, elapsed=0.0):
+        input_pdf = input_files[index]
+        result = {
+            "input": input_pdf,
+            "output": _batch_output(input_pdf, output_dir, suffix),
+            "status": status,
+            "original_size": original_size,
+            "compressed_size": compressed_size,
+            "ratio": compressed_size / original_size if status == "ok" and original_size else None,
+            "elapsed": elapsed,
+            "error": error,
+        }
+        results[index] = result
+        if progress_callback is not None:
+            progress_callback(result)
+    
+    while pending or running:
+        # 補滿可同時執行的子程序
+        while pending and len(running) < workers:
+            index, input_pdf = pending.pop()
+            reader, writer = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_compress_worker,
+                args=(writer, input_pdf, _batch_output(input_pdf, output_dir, suffix), compression_level,
+                      image_options),
+                daemon=True,
+            )
+            process.start()
+            writer.close()
+            running[reader] = (index, process, time.perf_counter())
+        
+        # 等到有子程序完成，或最早的逾時時間到達
+        wait_time = None
+        if timeout is not None:
+            now = time.perf_counter()
+            wait_time = max(0.0, min(start + timeout for _, _, start in running.values()) - now)
+        for reader in wait(list(running), wait_time):
+            index, process, start = running.pop(reader)
+            try:
+                status, original_size, compressed_size, error = reader.recv()
+            except EOFError:
+                status, original_size, compressed_size = "error", None, None
+                error = "子程序異常結束"
+            reader.close()
+            process.join()
+            if status == "error" and process.exitcode:
+                error = f"{error} (exit code {process.exitcode})"
+            finish(index, status, original_size, compressed_size, error, time.perf_counter() - start)
+        
+        # 終止逾時的子程序
+        if timeout is not None:
+            now = time.perf_counter()
+            for reader, (index, process, start) in list(running.items()):
+                if now - start < timeout:
+                    continue
+                del running[reader]
+                process.kill()
+                process.join()
+                reader.close()
+                output_pdf = _batch_output(input_files[index], output_dir, suffix)
+                if os.path.exists(output_pdf):
+                    os.remove(output_pdf)
+                finish(index, "timeout", error=f"超過 {timeout} 秒", elapsed=now - start)
+    
+    return results
+
 if __name__ == "__main__":
     # PDF 檔案路徑
     input_pdf = r"C:\Users"
@@ -93,4 +423,8 @@ if __name__ == "__main__":
     # output_pdf = r"C:\Users\"
     
     # 執行壓縮（可選 "low", "medium", "high"）
-    compress_pdf_safe(input_pdf, compression_level="high")
\ No newline at end of file
+    compress_pdf_safe(input_pdf, compression_level="high")
+    
+    # 批次壓縮整個資料夾
+    # for result in compress_batch(r"C:\Users", compression_level="high", timeout=600):
+    #     print(result["status"], result["input"], result["ratio"])
\ No newline at end of file
@@ -1,70 +1,63 @@
 import os
+import re
+import asyncio
+import functools
+import shutil
 import subprocess
+import tempfile
+import threading
 import time
+import fitz  # PyMuPDF
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
 
-def compress_pdf_with_ghostscript(input_pdf, output_pdf=None, compression_level="high", gs_path=None):
+# PATH 中可能的 Ghostscript 命令名稱 (Linux / macOS 為 gs，Windows 為 gswin64c / gswin32c)
+GS_COMMANDS = ("gs", "gswin64c", "gswin32c")
+
+# Windows 預設安裝位置
+GS_INSTALL_PATTERNS = (
+    r"C:\Program Files\gs\gs*\bin\gswin64c.exe",
+    r"C:\Program Files (x86)\gs\gs*\bin\gswin32c.exe",
+)
+
+def _gs_version_key(path):
+    """由安裝路徑 (例如 gs10.05.1) 取出版本號，用於排序"""
+    match = re.search(r"gs(\d+(?:\.\d+)*)", os.path.basename(os.path.dirname(os.path.dirname(path))))
+    return tuple(int(part) for part in match.group(1).split(".")) if match else ()
+
+@functools.lru_cache(maxsize=None)
+def find_ghostscript():
     """
-    使用 Ghostscript 壓縮 PDF 檔案
+    尋找 Ghostscript 執行檔，結果在同一個程序中快取
     
-    Args:
-        input_pdf (str): 輸入 PDF 檔案路徑
-        output_pdf (str, optional): 輸出 PDF 檔案路徑
-        compression_level (str): 壓縮等級，可選 "screen", "ebook", "printer", "prepress", "high", "extreme"
-        gs_path (str): Ghostscript 執行檔的完整路徑
-    """
-    if output_pdf is None:
-        file_name, file_ext = os.path.splitext(input_pdf)
-        output_pdf = f"{file_name}_compressed{file_ext}"
+    先在 PATH 中尋找，再搜尋 Windows 預設安裝位置 (版本最新者優先)。
     
-    # 獲取原始檔案大小
-    original_size = os.path.getsize(input_pdf)
-    original_size_mb = original_size / (1024 * 1024)
+    Returns:
+        str: Ghostscript 執行檔路徑
+    """
+    for command in GS_COMMANDS:
+        path = shutil.which(command)
+        if path:
+            return path
     
-    print(f"開始壓縮 PDF: {input_pdf}")
-    print(f"原始檔案大小: {original_size_mb:.2f} MB")
+    installed = []
+    for pattern in GS_INSTALL_PATTERNS:
+        installed.extend(glob(pattern))
+    if installed:
+        return max(installed, key=_gs_version_key)
     
-    # 找到 Ghostscript 執行檔
-    if gs_path is None:
-        # 嘗試幾個常見的安裝位置
-        possible_paths = [
-            "gswin64c",  # 如果在 PATH 中
-            r"C:\Program Files\gs\gs10.05.1\bin\gswin64c.exe",
-            r"C:\Program Files\gs\gs10.00.0\bin\gswin64c.exe",
-            r"C:\Program Files\gs\gs9.56.1\bin\gswin64c.exe",
-            r"C:\Program Files\gs\gs9.55.0\bin\gswin64c.exe",
-            # 檢查 Program Files (x86) 路徑
-            r"C:\Program Files (x86)\gs\gs10.05.1\bin\gswin32c.exe",
-            r"C:\Program Files (x86)\gs\gs10.00.0\bin\gswin32c.exe",
-            r"C:\Program Files (x86)\gs\gs9.56.1\bin\gswin32c.exe",
-            r"C:\Program Files (x86)\gs\gs9.55.0\bin\gswin32c.exe",
-        ]
-        
-        # 檢查 Ghostscript 可能的安裝路徑
-        gs_found = False
-        for path in possible_paths:
-            try:
-                # 測試是否可執行
-                if os.path.isfile(path):
-                    subprocess.run([path, "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    gs_path = path
-                    gs_found = True
-                    print(f"找到 Ghostscript: {path}")
-                    break
-                elif " " not in path:  # 命令可能在 PATH 中
-                    subprocess.run([path, "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    gs_path = path
-                    gs_found = True
-                    print(f"找到 Ghostscript: {path} (在 PATH 中)")
-                    break
-            except (subprocess.SubprocessError, FileNotFoundError):
-                continue
-        
-        if not gs_found:
-            raise FileNotFoundError("找不到 Ghostscript 執行檔。請安裝 Ghostscript 或提供完整路徑。")
+    raise FileNotFoundError("找不到 Ghostscript 執行檔。請安裝 Ghostscript 或提供完整路徑。")
+
+def build_gs_params(compression_level):
+    """
+    依壓縮等級建立 Ghostscript 參數
     
-    start_time = time.time()
+    Args:
+        compression_level (str): "screen", "ebook", "printer", "prepress", "high" 或 "extreme"
     
-    # 設定 Ghostscript 參數
+    Returns:
+        list: 命令列參數
+    """
     if compression_level == "screen":
         # 螢幕查看用 (72 dpi)
         gs_params = ["-dPDFSETTINGS=/screen"]
@@ -126,13 +119,192 @@ def compress_pdf_with_ghostscript(input_pdf, output_pdf=None, compression_level=
     else:
         raise ValueError("壓縮等級必須是 'screen', 'ebook', 'printer', 'prepress', 'high' 或 'extreme'")
     
+    return gs_params
+
+def jpeg_qfactor(quality):
+    """將 JPEG 品質 (1-100) 換算為 Ghostscript DCTEncode 的 QFactor (與 IJG 量化表縮放一致)"""
+    quality = min(max(int(quality), 1), 100)
+    scale = 5000 / quality if quality < 50 else 200 - 2 * quality
+    return max(scale, 1) / 100
+
+def build_custom_params(image_resolution, jpeg_quality):
+    """
+    以指定的圖片解析度與 JPEG 品質建立 Ghostscript 參數
+    
+    Args:
+        image_resolution (int): 彩色 / 灰階圖片的目標解析度 (dpi)
+        jpeg_quality (int): JPEG 品質 (1-100)
+    
+    Returns:
+        tuple: (命令列參數, 設定 JPEG 品質的 PostScript 指令)
+    """
+    gs_params = [
+        f"-dColorImageResolution={image_resolution}",
+        f"-dGrayImageResolution={image_resolution}",
+        "-dDownsampleColorImages=true",
+        "-dDownsampleGrayImages=true",
+        "-dColorImageDownsampleType=/Bicubic",
+        "-dGrayImageDownsampleType=/Bicubic",
+        # 關閉自動選擇濾鏡，JPEG 品質設定才會生效
+        "-dAutoFilterColorImages=false",
+        "-dAutoFilterGrayImages=false",
+        "-dColorImageFilter=/DCTEncode",
+        "-dGrayImageFilter=/DCTEncode",
+        "-dOptimize=true",
+        "-dEmbedAllFonts=true",
+        "-dSubsetFonts=true",
+        "-dAutoRotatePages=/None",
+        "-dCompatibilityLevel=1.5",
+        "-dDetectDuplicateImages=true",
+        "-dPDFA=false",
+        "-dNOPAUSE",
+        "-dQUIET",
+        "-dBATCH",
+        "-dSAFER"
+    ]
+    image_dict = f"<< /QFactor {jpeg_qfactor(jpeg_quality):.2f} /Blend 1 /HSamples [2 1 1 2] /VSamples [2 1 1 2] >>"
+    postscript = f"<< /ColorImageDict {image_dict} /GrayImageDict {image_dict} >> setdistillerparams"
+    return gs_params, postscript
+
+def resolve_params(compression_level, image_resolution=None, jpeg_quality=None):
+    """
+    取得壓縮參數；指定圖片解析度或品質時使用自訂設定，否則使用壓縮等級的設定
+    
+    Returns:
+        tuple: (命令列參數, PostScript 指令或 None)
+    """
+    if image_resolution is not None or jpeg_quality is not None:
+        return build_custom_params(image_resolution or 72, jpeg_quality or 75)
+    return build_gs_params(compression_level), None
+
+def _gs_command(gs_path, input_pdf, output_pdf, gs_params, postscript=None):
+    gs_command = [gs_path, "-sDEVICE=pdfwrite", f"-sOutputFile={output_pdf}"] + gs_params
+    if postscript:
+        gs_command += ["-c", postscript, "-f"]
+    gs_command.append(input_pdf)
+    return gs_command
+
+def run_ghostscript(gs_path, input_pdf, output_pdf, gs_params, postscript=None):
+    """
+    執行一次 Ghostscript pdfwrite
+    
+    Args:
+        gs_path (str): Ghostscript 執行檔
+        input_pdf (str): 輸入 PDF
+        output_pdf (str): 輸出 PDF
+        gs_params (list): 命令列參數
+        postscript (str, optional): 處理輸入檔前執行的 PostScript 指令 (例如 setdistillerparams)
+    """
+    gs_command = _gs_command(gs_path, input_pdf, output_pdf, gs_params, postscript)
+    subprocess.run(gs_command, check=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+
+def _postscript_string(text):
+    """轉為 PostScript 字串常值，跳脫反斜線與括號"""
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return f"({escaped})"
+
+def run_ghostscript_jobs(gs_path, jobs, gs_params, postscript=None):
+    """
+    在同一個 Ghostscript 程序中依序處理多個檔案
+    
+    第一個檔案使用 -sOutputFile，其後每個檔案前以 setpagedevice 切換 OutputFile，
+    pdfwrite 會關閉上一個輸出檔並開始新的檔案，省去每個檔案啟動直譯器的成本。
+    
+    Args:
+        gs_path (str): Ghostscript 執行檔
+        jobs (list): (輸入 PDF, 輸出 PDF) 清單
+        gs_params (list): 命令列參數
+        postscript (str, optional): 處理第一個檔案前執行的 PostScript 指令
+    """
+    (first_input, first_output), rest = jobs[0], jobs[1:]
+    # -dSAFER 只允許寫入明確允許的檔案
+    permits = [f"--permit-file-write={output_pdf}" for _, output_pdf in jobs]
+    gs_command = _gs_command(gs_path, first_input, first_output, permits + gs_params, postscript)
+    for input_pdf, output_pdf in rest:
+        gs_command += ["-c", f"<< /OutputFile {_postscript_string(output_pdf)} >> setpagedevice",
+                       "-f", input_pdf]
+    subprocess.run(gs_command, check=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+
+# Ghostscript 執行檔 -> 是否能以 setpagedevice 切換輸出檔
+_output_switching = {}
+_output_switching_lock = threading.Lock()
+
+def _probe_output_switching(gs_path, gs_params):
+    """以兩個小檔案實際執行一次批次處理，確認每個輸出檔的頁數正確"""
+    with tempfile.TemporaryDirectory(prefix="gs_probe_") as work_dir:
+        jobs = []
+        for page_count in (1, 2):
+            input_pdf = os.path.join(work_dir, f"probe_{page_count}.pdf")
+            with fitz.open() as pdf_document:
+                for _ in range(page_count):
+                    pdf_document.new_page()
+                pdf_document.save(input_pdf)
+            jobs.append((input_pdf, os.path.join(work_dir, f"probe_{page_count}_out.pdf")))
+        try:
+            run_ghostscript_jobs(gs_path, jobs, gs_params)
+        except (subprocess.CalledProcessError, OSError):
+            return False
+        return [_page_count(output_pdf) for _, output_pdf in jobs] == [1, 2]
+
+def supports_output_switching(gs_path, gs_params):
+    """
+    檢查 Ghostscript 能否在 -dSAFER 下以 setpagedevice 切換輸出檔
+    
+    部分版本或設定會拒絕切換、或將所有頁面寫進第一個輸出檔；每個執行檔只檢查一次。
+    
+    Args:
+        gs_path (str): Ghostscript 執行檔
+        gs_params (list): 批次處理時使用的命令列參數
+    
+    Returns:
+        bool: 是否可以在同一個程序中處理多個檔案
+    """
+    with _output_switching_lock:
+        if gs_path not in _output_switching:
+            _output_switching[gs_path] = _probe_output_switching(gs_path, gs_params)
+        return _output_switching[gs_path]
+
+def compress_pdf_with_ghostscript(input_pdf, output_pdf=None, compression_level="high", gs_path=None,
+                                  image_resolution=None, jpeg_quality=None, verbose=True):
+    """
+    使用 Ghostscript 壓縮 PDF 檔案
+    
+    Args:
+        input_pdf (str): 輸入 PDF 檔案路徑
+        output_pdf (str, optional): 輸出 PDF 檔案路徑
+        compression_level (str): 壓縮等級，可選 "screen", "ebook", "printer", "prepress", "high", "extreme"
+        gs_path (str): Ghostscript 執行檔的完整路徑
+        image_resolution (int, optional): 自訂圖片解析度，指定時取代壓縮等級的設定
+        jpeg_quality (int, optional): 自訂 JPEG 品質，指定時取代壓縮等級的設定
+        verbose (bool): 是否輸出處理進度
+    """
+    if output_pdf is None:
+        file_name, file_ext = os.path.splitext(input_pdf)
+        output_pdf = f"{file_name}_compressed{file_ext}"
+    
+    # 獲取原始檔案大小
+    original_size = os.path.getsize(input_pdf)
+    original_size_mb = original_size / (1024 * 1024)
+    
+    if verbose:
+        print(f"開始壓縮 PDF: {input_pdf}")
+        print(f"原始檔案大小: {original_size_mb:.2f} MB")
+    
+    # 找到 Ghostscript 執行檔
+    if gs_path is None:
+        gs_path = find_ghostscript()
+        if verbose:
+            print(f"找到 Ghostscript: {gs_path}")
+    
+    start_time = time.time()
+    
+    # 設定 Ghostscript 參數；指定圖片解析度或品質時使用自訂設定
+    gs_params, postscript = resolve_params(compression_level, image_resolution, jpeg_quality)
+    
     # 執行 Ghostscript 命令
     try:
-        # 構建 Ghostscript 命令
-        gs_command = [gs_path, "-sDEVICE=pdfwrite", f"-sOutputFile={output_pdf}"] + gs_params + [input_pdf]
-        
         # 執行命令
-        process = subprocess.run(gs_command, check=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+        run_ghostscript(gs_path, input_pdf, output_pdf, gs_params, postscript)
         
         # 檢查輸出檔案是否存在
         if not os.path.exists(output_pdf):
@@ -143,29 +315,531 @@ def compress_pdf_with_ghostscript(input_pdf, output_pdf=None, compression_level=
         compressed_size_mb = compressed_size / (1024 * 1024)
         compression_ratio = (1 - compressed_size / original_size) * 100
         
-        print(f"\n壓縮完成！")
-        print(f"原始檔案大小: {original_size_mb:.2f} MB")
-        print(f"壓縮後大小: {compressed_size_mb:.2f} MB")
-        print(f"壓縮率: {compression_ratio:.2f}%")
-        print(f"耗時: {time.time() - start_time:.2f} 秒")
-        print(f"輸出檔案: {output_pdf}")
+        if verbose:
+            print(f"\n壓縮完成！")
+            print(f"原始檔案大小: {original_size_mb:.2f} MB")
+            print(f"壓縮後大小: {compressed_size_mb:.2f} MB")
+            print(f"壓縮率: {compression_ratio:.2f}%")
+            print(f"耗時: {time.time() - start_time:.2f} 秒")
+            print(f"輸出檔案: {output_pdf}")
         
-        # 如果壓縮後的檔案比原始檔案大，發出警告
-        if compressed_size > original_size:
-            print("\n警告: 壓縮後的檔案比原始檔案更大！")
+            # 如果壓縮後的檔案比原始檔案大，發出警告
+            if compressed_size > original_size:
+                print("\n警告: 壓縮後的檔案比原始檔案更大！")
         
         return output_pdf, original_size, compressed_size
         
     except subprocess.CalledProcessError as e:
-        print(f"Ghostscript 執行失敗: {e.stderr.decode() if e.stderr else str(e)}")
+        if verbose:
+            print(f"Ghostscript 執行失敗: {e.stderr.decode() if e.stderr else str(e)}")
         raise
     except Exception as e:
-        print(f"壓縮失敗: {str(e)}")
+        if verbose:
+            print(f"壓縮失敗: {str(e)}")
         raise
 
+def _output_jobs(input_pdfs, output_dir, suffix):
+    """為每個輸入檔決定輸出路徑，回傳 (輸入, 輸出) 清單"""
+    jobs = []
+    for input_pdf in input_pdfs:
+        file_name, file_ext = os.path.splitext(os.path.basename(input_pdf))
+        folder = output_dir if output_dir is not None else os.path.dirname(input_pdf)
+        jobs.append((input_pdf, os.path.join(folder, f"{file_name}{suffix}{file_ext}")))
+    return jobs
+
+def _job_result(input_pdf, output_pdf, error=None):
+    original_size = os.path.getsize(input_pdf) if os.path.exists(input_pdf) else None
+    result = {"input": input_pdf, "output": output_pdf, "status": "ok", "original_size": original_size,
+              "compressed_size": None, "error": error}
+    if error is not None or not os.path.exists(output_pdf):
+        result["status"] = "error"
+        result["error"] = error or "未生成輸出檔案"
+    else:
+        result["compressed_size"] = os.path.getsize(output_pdf)
+    return result
+
+def _page_count(pdf_path):
+    """PDF 的頁數，不存在或無法開啟時回傳 None"""
+    try:
+        with fitz.open(pdf_path) as pdf_document:
+            return pdf_document.page_count
+    except Exception:
+        return None
+
+def _run_chunk(gs_path, chunk, gs_params, postscript, batched=True, verbose=False):
+    """
+    處理一組檔案；整組失敗時改為逐檔執行，找出失敗的檔案
+    
+    setpagedevice 切換輸出檔沒有生效時 (例如所有頁面都寫進第一個輸出檔)，
+    Ghostscript 不會回報錯誤，因此以頁數確認每個輸出檔，不符的檔案同樣逐檔重做。
+    batched 為 False 時直接逐檔執行。
+    """
+    results = [None] * len(chunk)
+    retry = list(range(len(chunk)))
+    if batched and len(chunk) > 1:
+        try:
+            run_ghostscript_jobs(gs_path, chunk, gs_params, postscript)
+            retry = []
+            for index, (input_pdf, output_pdf) in enumerate(chunk):
+                input_pages = _page_count(input_pdf)
+                if input_pages is not None and _page_count(output_pdf) == input_pages:
+                    results[index] = _job_result(input_pdf, output_pdf)
+                else:
+                    retry.append(index)
+            if retry and verbose:
+                print(f"批次輸出有 {len(retry)} 個檔案頁數不符，改為逐檔重新處理: "
+                      f"{', '.join(os.path.basename(chunk[index][0]) for index in retry)}")
+        except subprocess.CalledProcessError as e:
+            if verbose:
+                message = e.stderr.decode(errors="replace").strip() if e.stderr else str(e)
+                print(f"批次處理 {len(chunk)} 個檔案失敗，改為逐檔處理: {message or e}")
+    
+    for index in retry:
+        input_pdf, output_pdf = chunk[index]
+        try:
+            run_ghostscript(gs_path, input_pdf, output_pdf, gs_params, postscript)
+            results[index] = _job_result(input_pdf, output_pdf)
+        except subprocess.CalledProcessError as e:
+            if os.path.exists(output_pdf):
+                os.remove(output_pdf)
+            message = e.stderr.decode(errors="replace").strip() if e.stderr else str(e)
+            results[index] = _job_result(input_pdf, output_pdf, message or str(e))
+    return results
+
+def compress_batch_with_ghostscript(input_pdfs, output_dir=None, compression_level="high", gs_path=None,
+                                   chunk_size=50, workers=1, suffix="_compressed",
+                                   image_resolution=None, jpeg_quality=None, verbose=True):
+    """
+    以少數幾個 Ghostscript 程序批次壓縮大量 PDF
+    
+    每 chunk_size 個檔案交給同一個 Ghostscript 程序處理，避免每個檔案重新啟動直譯器；
+    某一組執行失敗時，該組改為逐檔執行，只有出錯的檔案會被標記為失敗。
+    Ghostscript 無法在 -dSAFER 下切換輸出檔時 (見 supports_output_switching)，一開始就逐檔執行。
+    
+    Args:
+        input_pdfs (list): 輸入 PDF 路徑
+        output_dir (str, optional): 輸出資料夾 (預設: 與輸入檔相同資料夾)
+        compression_level (str): 壓縮等級，同 compress_pdf_with_ghostscript
+        gs_path (str, optional): Ghostscript 執行檔的完整路徑
+        chunk_size (int): 每個 Ghostscript 程序處理的檔案數
+        workers (int): 同時執行的 Ghostscript 程序數
+        suffix (str): 輸出檔名附加的字尾
+        image_resolution (int, optional): 自訂圖片解析度
+        jpeg_quality (int, optional): 自訂 JPEG 品質
+        verbose (bool): 是否輸出改為逐檔處理的原因
+    
+    Returns:
+        list: 依輸入順序的結果 dict，包含 input、output、status ("ok"/"error")、
+              original_size、compressed_size、error
+    """
+    if gs_path is None:
+        gs_path = find_ghostscript()
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    gs_params, postscript = resolve_params(compression_level, image_resolution, jpeg_quality)
+    jobs = _output_jobs(input_pdfs, output_dir, suffix)
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    batched = chunk_size > 1 and len(jobs) > 1 and supports_output_switching(gs_path, gs_params)
+    if not batched and chunk_size > 1 and len(jobs) > 1 and verbose:
+        print(f"Ghostscript 無法在同一個程序中切換輸出檔，改為逐檔處理: {gs_path}")
+    
+    def run_chunk(chunk):
+        return _run_chunk(gs_path, chunk, gs_params, postscript, batched, verbose)
+    
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for chunk_results in executor.map(run_chunk, chunks):
+            results.extend(chunk_results)
+    return results
+
+# 非同步執行時保留的 Ghostscript 輸出上限 (只保留最後的部分)
+GS_LOG_LIMIT = 64 * 1024
+
+_PAGES_PATTERN = re.compile(rb"Processing pages (\d+) through (\d+)")
+_PAGE_PATTERN = re.compile(rb"^Page (\d+)")
+
+def _append_log(log, data, limit):
+    log.extend(data)
+    if len(log) > limit:
+        del log[:len(log) - limit]
+
+async def run_ghostscript_async(gs_path, input_pdf, output_pdf, gs_params, postscript=None,
+                                progress_callback=None, timeout=None, log_limit=GS_LOG_LIMIT):
+    """
+    以非同步子程序執行 Ghostscript，邊執行邊解析輸出回報進度
+    
+    會移除 -dQUIET 讓 Ghostscript 輸出 "Page N"；stdout / stderr 只保留最後 log_limit bytes。
+    逾時或被取消時終止子程序並刪除未完成的輸出檔。
+    
+    Args:
+        gs_path (str): Ghostscript 執行檔
+        input_pdf (str): 輸入 PDF
+        output_pdf (str): 輸出 PDF
+        gs_params (list): 命令列參數
+        postscript (str, optional): 處理輸入檔前執行的 PostScript 指令
+        progress_callback (callable, optional): 每處理一頁呼叫 callback(頁碼, 總頁數或 None)
+        timeout (float, optional): 逾時秒數，超過時引發 asyncio.TimeoutError
+        log_limit (int): 保留的輸出 bytes 上限
+    
+    Returns:
+        str: Ghostscript 的輸出 (最後 log_limit bytes)
+    """
+    gs_params = [param for param in gs_params if param != "-dQUIET"]
+    gs_command = _gs_command(gs_path, input_pdf, output_pdf, gs_params, postscript)
+    process = await asyncio.create_subprocess_exec(
+        *gs_command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    log = bytearray()
+    page_total = None
+    
+    async def read_stdout():
+        nonlocal page_total
+        async for line in process.stdout:
+            _append_log(log, line, log_limit)
+            match = _PAGES_PATTERN.search(line)
+            if match:
+                page_total = int(match.group(2)) - int(match.group(1)) + 1
+                continue
+            match = _PAGE_PATTERN.match(line)
+            if match and progress_callback is not None:
+                progress_callback(int(match.group(1)), page_total)
+    
+    async def read_stderr():
+        async for line in process.stderr:
+            _append_log(log, line, log_limit)
+    
+    try:
+        await asyncio.wait_for(asyncio.gather(read_stdout(), read_stderr(), process.wait()), timeout)
+    except BaseException:
+        # 逾時、取消或其他錯誤：終止子程序並刪除未完成的輸出
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        if os.path.exists(output_pdf):
+            os.remove(output_pdf)
+        raise
+    
+    output = log.decode(errors="replace")
+    if process.returncode != 0:
+        if os.path.exists(output_pdf):
+            os.remove(output_pdf)
+        raise RuntimeError(f"Ghostscript 執行失敗 (exit code {process.returncode}): {output.strip()[-2000:]}")
+    return output
+
+async def compress_batch_async(input_pdfs, output_dir=None, compression_level="high", gs_path=None,
+                               concurrency=4, timeout=None, progress_callback=None, suffix="_compressed",
+                               image_resolution=None, jpeg_quality=None, log_limit=GS_LOG_LIMIT):
+    """
+    在同一個事件迴圈中同時執行多個 Ghostscript 壓縮，最多 concurrency 個子程序
+    
+    單一檔案失敗或逾時不影響其他檔案；取消整個工作時所有子程序都會被終止。
+    
+    Args:
+        input_pdfs (list): 輸入 PDF 路徑
+        output_dir (str, optional): 輸出資料夾 (預設: 與輸入檔相同資料夾)
+        compression_level (str): 壓縮等級，同 compress_pdf_with_ghostscript
+        gs_path (str, optional): Ghostscript 執行檔的完整路徑
+        concurrency (int): 同時執行的 Ghostscript 程序數
+        timeout (float, optional): 單一檔案的逾時秒數
+        progress_callback (callable, optional): callback(輸入檔, 頁碼, 總頁數或 None)
+        suffix (str): 輸出檔名附加的字尾
+        image_resolution (int, optional): 自訂圖片解析度
+        jpeg_quality (int, optional): 自訂 JPEG 品質
+        log_limit (int): 每個檔案保留的輸出 bytes 上限
+    
+    Returns:
+        list: 依輸入順序的結果 dict，包含 input、output、status ("ok"/"error"/"timeout")、
+              original_size、compressed_size、elapsed、error、log
+    """
+    if gs_path is None:
+        gs_path = find_ghostscript()
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    gs_params, postscript = resolve_params(compression_level, image_resolution, jpeg_quality)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def compress_one(input_pdf, output_pdf):
+        callback = None
+        if progress_callback is not None:
+            callback = functools.partial(progress_callback, input_pdf)
+        async with semaphore:
+            start_time = time.perf_counter()
+            log, error, status = None, None, "ok"
+            try:
+                log = await run_ghostscript_async(gs_path, input_pdf, output_pdf, gs_params, postscript,
+                                                  callback, timeout, log_limit)
+            except asyncio.TimeoutError:
+                status, error = "timeout", f"超過 {timeout} 秒"
+            except (OSError, RuntimeError) as e:
+                status, error = "error", str(e)
+            result = _job_result(input_pdf, output_pdf, error)
+            if status == "timeout":
+                result["status"] = status
+            result["elapsed"] = time.perf_counter() - start_time
+            result["log"] = log
+            return result
+    
+    jobs = _output_jobs(input_pdfs, output_dir, suffix)
+    return await asyncio.gather(*(compress_one(input_pdf, output_pdf) for input_pdf, output_pdf in jobs))
+
+def compress_batch_concurrent(input_pdfs, **options):
+    """
+    compress_batch_async 的同步版本，在新的事件迴圈中執行
+    
+    Args:
+        input_pdfs (list): 輸入 PDF 路徑
+        **options: 同 compress_batch_async
+    
+    Returns:
+        list: 同 compress_batch_async
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(compress_batch_async(input_pdfs, **options))
+    finally:
+        loop.close()
+
+def _shard_ranges(page_count, shard_count):
+    """將 1..page_count 平均切成 shard_count 段，回傳 (第一頁, 最後一頁) 清單 (從 1 開始)"""
+    shard_size, remainder = divmod(page_count, shard_count)
+    ranges = []
+    first = 1
+    for i in range(shard_count):
+        last = first + shard_size - 1 + (1 if i < remainder else 0)
+        ranges.append((first, last))
+        first = last + 1
+    return ranges
+
+def _restore_links(pdf_document, links):
+    """
+    以原檔的連結取代合併後文件各頁的連結
+    
+    Args:
+        pdf_document (fitz.Document): 合併後的文件，頁面順序與原檔相同
+        links (list): 原檔各頁 get_links() 的結果
+    """
+    for page, page_links in zip(pdf_document, links):
+        for link in page.get_links():
+            page.delete_link(link)
+        for link in page_links:
+            try:
+                page.insert_link(link)
+            except Exception:
+                # 目的地無法在新文件中表示的連結 (例如已失效的頁碼) 略過
+                continue
+
+def compress_pdf_sharded(input_pdf, output_pdf=None, compression_level="high", gs_path=None, workers=None,
+                         min_shard_pages=50, image_resolution=None, jpeg_quality=None, verbose=True):
+    """
+    將大型 PDF 依頁面範圍切成數段，平行以 Ghostscript 壓縮後再合併
+    
+    Ghostscript 為單執行緒，每段以 -dFirstPage / -dLastPage 交給獨立的程序處理；
+    合併時以 garbage=4 儲存，各段中相同的圖片與物件只保留一份，並沿用原檔的書籤與文件資訊。
+    指向其他段頁面的內部連結在分段時會遺失，合併後依原檔的連結重新建立。
+    頁數不足兩段時直接使用 compress_pdf_with_ghostscript。
+    
+    Args:
+        input_pdf (str): 輸入 PDF 檔案路徑
+        output_pdf (str, optional): 輸出 PDF 檔案路徑
+        compression_level (str): 壓縮等級，同 compress_pdf_with_ghostscript
+        gs_path (str, optional): Ghostscript 執行檔的完整路徑
+        workers (int, optional): 同時執行的 Ghostscript 程序數 (預設: CPU 核心數)
+        min_shard_pages (int): 每段最少頁數，避免過多程序啟動成本
+        image_resolution (int, optional): 自訂圖片解析度
+        jpeg_quality (int, optional): 自訂 JPEG 品質
+        verbose (bool): 是否輸出處理進度
+    
+    Returns:
+        tuple: (輸出路徑, 原始大小, 壓縮後大小)
+    """
+    if output_pdf is None:
+        file_name, file_ext = os.path.splitext(input_pdf)
+        output_pdf = f"{file_name}_compressed{file_ext}"
+    if gs_path is None:
+        gs_path = find_ghostscript()
+    workers = workers or os.cpu_count() or 1
+    
+    with fitz.open(input_pdf) as source:
+        page_count = source.page_count
+        toc = source.get_toc(simple=False)
+        metadata = source.metadata
+        # 各頁的連結 (包含指向命名目的地的連結)，合併後重新建立
+        links = [page.get_links() for page in source]
+    
+    shard_count = min(workers, page_count // max(1, min_shard_pages))
+    if shard_count < 2:
+        return compress_pdf_with_ghostscript(input_pdf, output_pdf, compression_level, gs_path,
+                                             image_resolution, jpeg_quality, verbose)
+    
+    original_size = os.path.getsize(input_pdf)
+    start_time = time.time()
+    gs_params, postscript = resolve_params(compression_level, image_resolution, jpeg_quality)
+    ranges = _shard_ranges(page_count, shard_count)
+    if verbose:
+        print(f"開始分段壓縮 PDF: {input_pdf} ({page_count} 頁，{shard_count} 段)")
+    
+    work_dir = tempfile.mkdtemp(prefix="gs_shards_")
+    try:
+        def compress_shard(index):
+            first, last = ranges[index]
+            shard_pdf = os.path.join(work_dir, f"shard_{index:04d}.pdf")
+            shard_params = [f"-dFirstPage={first}", f"-dLastPage={last}"] + gs_params
+            run_ghostscript(gs_path, input_pdf, shard_pdf, shard_params, postscript)
+            if verbose:
+                print(f"已完成第 {first}-{last} 頁")
+            return shard_pdf
+        
+        with ThreadPoolExecutor(max_workers=shard_count) as executor:
+            shard_pdfs = list(executor.map(compress_shard, range(shard_count)))
+        
+        # 依順序合併各段，garbage=4 會合併各段中內容相同的圖片與字型物件
+        merged = fitz.open()
+        for shard_pdf in shard_pdfs:
+            with fitz.open(shard_pdf) as shard:
+                merged.insert_pdf(shard)
+        if any(links):
+            _restore_links(merged, links)
+        if toc:
+            merged.set_toc(toc)
+        merged.set_metadata(metadata)
+        merged.save(output_pdf, garbage=4, deflate=True)
+        merged.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    compressed_size = os.path.getsize(output_pdf)
+    if verbose:
+        print(f"\n壓縮完成！")
+        print(f"原始檔案大小: {original_size / (1024 * 1024):.2f} MB")
+        print(f"壓縮後大小: {compressed_size / (1024 * 1024):.2f} MB")
+        print(f"壓縮率: {(1 - compressed_size / original_size) * 100:.2f}%")
+        print(f"耗時: {time.time() - start_time:.2f} 秒")
+        print(f"輸出檔案: {output_pdf}")
+    return output_pdf, original_size, compressed_size
+
+# 目標大小搜尋的候選設定 (解析度與品質的所有組合，依樣本估計的大小排序)
+TARGET_RESOLUTIONS = (300, 200, 150, 110, 72, 50)
+TARGET_QUALITIES = (85, 70, 55, 40)
+
+def _sample_page_numbers(page_count, sample_pages):
+    """平均分布在整份文件中的取樣頁碼 (從 0 開始)"""
+    count = max(1, min(sample_pages, page_count))
+    return sorted({i * page_count // count for i in range(count)})
+    
+def _make_sample_pdf(input_pdf, sample_pdf, pages):
+    """將輸入 PDF 的指定頁面另存為樣本"""
+    with fitz.open(input_pdf) as doc:
+        doc.select(pages)
+        doc.save(sample_pdf, garbage=3, deflate=True)
+
+def compress_to_target(input_pdf, max_bytes, output_pdf=None, gs_path=None, sample_pages=8,
+                       resolutions=TARGET_RESOLUTIONS, qualities=TARGET_QUALITIES, verbose=True):
+    """
+    壓縮 PDF 到指定大小以下，並盡量保留畫質
+    
+    先以平均取樣的數頁估計每組 (圖片解析度, JPEG 品質) 的完整檔案大小：
+    字型、文件結構等不隨頁數增加的固定成本，由頁數不同的兩個樣本求出後
+    只計算一次，其餘部分再依頁數比例放大。候選設定依估計大小由大到小排列，
+    選出第一組估計值符合的設定，只對完整檔案執行一次；實際結果仍超過上限時，
+    以實際 / 估計的比例修正後改用下一組設定。
+    
+    Args:
+        input_pdf (str): 輸入 PDF 檔案路徑
+        max_bytes (int): 輸出檔案大小上限 (bytes)
+        output_pdf (str, optional): 輸出 PDF 檔案路徑
+        gs_path (str, optional): Ghostscript 執行檔的完整路徑
+        sample_pages (int): 取樣頁數
+        resolutions (tuple): 候選圖片解析度
+        qualities (tuple): 候選 JPEG 品質
+        verbose (bool): 是否輸出處理進度
+    
+    Returns:
+        dict: output、size、resolution、quality (原檔已符合時為 None)、
+              fits (是否低於上限)、full_passes (完整壓縮次數)
+    """
+    if output_pdf is None:
+        file_name, file_ext = os.path.splitext(input_pdf)
+        output_pdf = f"{file_name}_compressed{file_ext}"
+    if gs_path is None:
+        gs_path = find_ghostscript()
+    
+    result = {"output": output_pdf, "size": os.path.getsize(input_pdf), "resolution": None,
+              "quality": None, "fits": True, "full_passes": 0}
+    if result["size"] <= max_bytes:
+        shutil.copyfile(input_pdf, output_pdf)
+        if verbose:
+            print(f"原始檔案已小於上限，不需壓縮: {input_pdf}")
+        return result
+    
+    work_dir = tempfile.mkdtemp(prefix="gs_target_")
+    try:
+        with fitz.open(input_pdf) as doc:
+            page_count = doc.page_count
+        pages = _sample_page_numbers(page_count, sample_pages)
+        # 較小的樣本取自同一批頁面，兩者的差只來自頁面內容
+        small_pages = pages[::2]
+        sample_pdf = os.path.join(work_dir, "sample.pdf")
+        small_pdf = os.path.join(work_dir, "sample_small.pdf")
+        _make_sample_pdf(input_pdf, sample_pdf, pages)
+        _make_sample_pdf(input_pdf, small_pdf, small_pages)
+        
+        def compress_sample(pdf_path, resolution, quality):
+            name = os.path.splitext(os.path.basename(pdf_path))[0]
+            sample_output = os.path.join(work_dir, f"{name}_{resolution}_{quality}.pdf")
+            gs_params, postscript = build_custom_params(resolution, quality)
+            run_ghostscript(gs_path, pdf_path, sample_output, gs_params, postscript)
+            return os.path.getsize(sample_output)
+        
+        candidates = [(r, q) for r in resolutions for q in qualities]
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            sample_sizes = list(executor.map(lambda c: compress_sample(sample_pdf, *c), candidates))
+            
+            # 固定成本: size = fixed + per_page * pages，以最高設定的兩個樣本求解
+            fixed = 0
+            if len(pages) < page_count and len(small_pages) < len(pages):
+                top = max(range(len(candidates)), key=sample_sizes.__getitem__)
+                small_size = compress_sample(small_pdf, *candidates[top])
+                per_page = (sample_sizes[top] - small_size) / (len(pages) - len(small_pages))
+                fixed = min(max(0, small_size - per_page * len(small_pages)), min(sample_sizes))
+        
+        estimates = {candidate: fixed + (size - fixed) * page_count / len(pages)
+                     for candidate, size in zip(candidates, sample_sizes)}
+        # 估計大小越大通常畫質越好，例如 200 dpi / 品質 85 可能比 300 dpi / 品質 40 大
+        candidates.sort(key=estimates.__getitem__, reverse=True)
+        if verbose and fixed:
+            print(f"估計固定成本: {fixed / 1024:.0f} KB")
+        
+        # 實際大小 / 估計大小，第一次完整壓縮後更新
+        correction = 1.0
+        for index, (resolution, quality) in enumerate(candidates):
+            estimated = estimates[(resolution, quality)] * correction
+            is_last = index == len(candidates) - 1
+            if verbose:
+                print(f"{resolution} dpi / 品質 {quality}: 估計 {estimated / (1024 * 1024):.2f} MB")
+            if estimated > max_bytes and not is_last:
+                continue
+            
+            gs_params, postscript = build_custom_params(resolution, quality)
+            run_ghostscript(gs_path, input_pdf, output_pdf, gs_params, postscript)
+            size = os.path.getsize(output_pdf)
+            result.update(size=size, resolution=resolution, quality=quality,
+                          fits=size <= max_bytes, full_passes=result["full_passes"] + 1)
+            if verbose:
+                print(f"完整壓縮 {resolution} dpi / 品質 {quality}: {size / (1024 * 1024):.2f} MB")
+            if result["fits"]:
+                break
+            correction *= size / estimated
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if verbose and not result["fits"]:
+        print(f"\n警告: 最低設定仍無法壓縮到 {max_bytes / (1024 * 1024):.2f} MB 以下")
+    return result
+
 if __name__ == "__main__":
     # PDF 檔案路徑
-    input_pdf = r"C:\Users\"
+    input_pdf = r"C:\Users"
     
     # 手動指定 Ghostscript 路徑（如果您知道確切位置）
     # 替換為您電腦上 Ghostscript 的實際路徑
@@ -174,23 +848,9 @@ if __name__ == "__main__":
     # 如果您不確定 Ghostscript 位置，可以不指定 gs_path，讓程式自動搜尋
     # gs_path = None
     
-    # 執行壓縮 - 從低壓縮開始嘗試，如果壓縮後仍大於 10MB，則使用更激進的壓縮設定
+    # 執行壓縮 - 以取樣頁面估計大小，找出壓縮後小於 10MB 且畫質最好的設定
     try:
-        # 先嘗試高壓縮
-        output_pdf, _, compressed_size = compress_pdf_with_ghostscript(
-            input_pdf, 
-            compression_level="high",
-            gs_path=gs_path
-        )
-        
-        # 如果還是大於 10MB，嘗試極度壓縮
-        if compressed_size > 10 * 1024 * 1024:
-            print("\n文件仍大於 10MB，嘗試極度壓縮設定...")
-            compress_pdf_with_ghostscript(
-                input_pdf, 
-                output_pdf, 
-                compression_level="extreme",
-                gs_path=gs_path
-            )
+        result = compress_to_target(input_pdf, 10 * 1024 * 1024, gs_path=gs_path)
+        print(f"輸出檔案: {result['output']} ({result['size'] / (1024 * 1024):.2f} MB)")
     except Exception as e:
         print(f"壓縮過程中發生錯誤: {str(e)}")
\ No newline at end of file
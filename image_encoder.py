@@ -0,0 +1,103 @@
+import io
+from PIL import Image
+
+# 支援的輸出格式：副檔名 -> Pillow 格式名稱
+FORMATS = {
+    "jpg": "JPEG",
+    "jpeg": "JPEG",
+    "webp": "WEBP",
+    "png": "PNG",
+}
+
+# 未指定品質時的預設值（JPEG 與 PyMuPDF pix.save 的預設相同）
+DEFAULT_QUALITY = {
+    "JPEG": 95,
+    "WEBP": 80,
+}
+
+def pixmap_to_image(pix):
+    """
+    將 fitz.Pixmap 轉為 PIL Image，不複製像素資料
+    
+    使用 Image.frombuffer 直接包住 pix.samples_mv（舊版 PyMuPDF 退回 pix.samples），
+    回傳的 Image 與 Pixmap 共用記憶體，Pixmap 必須在 Image 使用完畢前保持存在。
+    
+    Args:
+        pix (fitz.Pixmap): 來源 Pixmap
+    
+    Returns:
+        PIL.Image.Image: 對應的圖片
+    """
+    if pix.alpha:
+        mode = {2: "LA", 4: "RGBA"}.get(pix.n)
+    else:
+        mode = {1: "L", 3: "RGB", 4: "CMYK"}.get(pix.n)
+    if mode is None:
+        raise ValueError(f"不支援的 Pixmap 色彩通道數: {pix.n}")
+    
+    samples = pix.samples_mv if hasattr(pix, "samples_mv") else pix.samples
+    return Image.frombuffer(mode, (pix.width, pix.height), samples, "raw", mode, pix.stride, 1)
+
+def encode_image(image, fp=None, fmt="jpg", quality=None, subsampling=None,
+                 progressive=False, optimize=False):
+    """
+    將 PIL Image 編碼為 JPEG / WebP / PNG
+    
+    Args:
+        image (PIL.Image.Image): 來源圖片
+        fp (str or file, optional): 輸出路徑或可寫入的檔案物件，None 時回傳 bytes
+        fmt (str): "jpg"、"jpeg"、"webp" 或 "png"
+        quality (int, optional): JPEG / WebP 品質 (1-100)
+        subsampling (str, optional): JPEG 色度取樣，"4:4:4"、"4:2:2" 或 "4:2:0"
+        progressive (bool): 是否輸出漸進式 JPEG
+        optimize (bool): 是否最佳化霍夫曼表 (JPEG) 或壓縮 (PNG)
+    
+    Returns:
+        bytes or None: fp 為 None 時回傳編碼後的資料
+    """
+    pil_format = FORMATS.get(fmt.lower())
+    if pil_format is None:
+        raise ValueError(f"不支援的輸出格式: {fmt}，可用: {', '.join(FORMATS)}")
+    
+    params = {}
+    if pil_format == "JPEG":
+        # JPEG 不支援透明通道
+        if image.mode in ("RGBA", "LA"):
+            image = image.convert(image.mode[:-1])
+        params["quality"] = quality if quality is not None else DEFAULT_QUALITY["JPEG"]
+        if subsampling is not None:
+            params["subsampling"] = subsampling
+        params["progressive"] = progressive
+        params["optimize"] = optimize
+    elif pil_format == "WEBP":
+        if image.mode == "CMYK":
+            image = image.convert("RGB")
+        params["quality"] = quality if quality is not None else DEFAULT_QUALITY["WEBP"]
+    else:
+        if image.mode == "CMYK":
+            image = image.convert("RGB")
+        params["optimize"] = optimize
+    
+    if fp is None:
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, **params)
+        return buffer.getvalue()
+    image.save(fp, pil_format, **params)
+    return None
+
+def encode_pixmap(pix, fp=None, fmt="jpg", quality=None, subsampling=None,
+                  progressive=False, optimize=False):
+    """
+    直接從 Pixmap 的像素緩衝區編碼為 JPEG / WebP / PNG
+    
+    參數同 encode_image。
+    """
+    return encode_image(
+        pixmap_to_image(pix),
+        fp,
+        fmt=fmt,
+        quality=quality,
+        subsampling=subsampling,
+        progressive=progressive,
+        optimize=optimize
+    )
\ No newline at end of file
@@ -0,0 +1,195 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+# EXIF Orientation -> 顯示時需要順時針旋轉的角度（不含鏡像的方向）
+_EXIF_ROTATION = {1: 0, 3: 180, 6: 90, 8: 270}
+
+# 可以原樣嵌入 PDF 的格式與色彩模式；JPEG 一律可直接嵌入，PNG 只在 fmt 為 "auto" 時使用
+_PASSTHROUGH_MODES = {"JPEG": ("L", "RGB", "CMYK"), "PNG": ("L", "RGB")}
+
+class PreparedImage:
+    """
+    已正規化、可直接嵌入 PDF 的圖片
+    
+    Attributes:
+        path (str): 原始檔案路徑
+        data (bytes): 圖片資料
+        fmt (str): "jpeg" 或 "png"
+        width (int): 像素寬度
+        height (int): 像素高度
+        mode (str): "L"、"RGB" 或 "CMYK"
+        rotate (int): 顯示時需順時針旋轉的角度 (0/90/180/270)
+        passthrough (bool): 是否為未重新編碼的原始 JPEG
+    """
+    def __init__(self, path, data, fmt, width, height, mode, rotate=0, passthrough=False):
+        self.path = path
+        self.data = data
+        self.fmt = fmt
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.rotate = rotate
+        self.passthrough = passthrough
+
+def _fits(size, max_size, rotate=0):
+    """size 為儲存的像素大小，rotate 為 90/270 時以旋轉後的方向和 max_size 比較"""
+    if max_size is None:
+        return True
+    width, height = (size[1], size[0]) if rotate in (90, 270) else size
+    return width <= max_size[0] and height <= max_size[1]
+
+def _try_passthrough(path, data, max_size, fmt):
+    """只讀檔頭判斷能否原樣使用圖片；可以時回傳 PreparedImage，否則回傳 None"""
+    with Image.open(io.BytesIO(data)) as img:
+        if img.format == "PNG" and fmt != "auto":
+            return None
+        if img.mode not in _PASSTHROUGH_MODES.get(img.format, ()):
+            return None
+        orientation = img.getexif().get(0x0112, 1)
+        if orientation not in _EXIF_ROTATION:
+            # 鏡像方向無法用頁面旋轉表示，需要解碼處理
+            return None
+        rotate = _EXIF_ROTATION[orientation]
+        if not _fits(img.size, max_size, rotate):
+            return None
+        return PreparedImage(path, data, img.format.lower(), img.width, img.height, img.mode,
+                             rotate=rotate, passthrough=True)
+
+def normalize_image(path, data, max_size=None, quality=75, fmt="jpeg"):
+    """
+    解碼並正規化圖片：套用 EXIF 方向、透明背景合成為白色並轉為 RGB、
+    超過 max_size 時縮小，最後重新編碼（在程序池中執行）
+    
+    Args:
+        path (str): 原始檔案路徑（僅用於回傳結果）
+        data (bytes): 圖片檔內容
+        max_size (tuple, optional): 最大像素 (寬, 高)，超過時等比例縮小
+        quality (int): JPEG 品質
+        fmt (str): "jpeg" 一律編碼為 JPEG；"auto" 時 JPEG 來源維持 JPEG，其他格式以無損 PNG 編碼
+    
+    Returns:
+        PreparedImage: 正規化後的圖片
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        if fmt == "auto":
+            fmt = "jpeg" if img.format == "JPEG" else "png"
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            rgba = img.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            img = background
+        elif img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+        
+        if not _fits(img.size, max_size):
+            img.thumbnail(max_size, Image.LANCZOS)
+        
+        buffer = io.BytesIO()
+        if fmt == "png":
+            img.save(buffer, "PNG")
+        else:
+            img.save(buffer, "JPEG", quality=quality)
+        return PreparedImage(path, buffer.getvalue(), fmt, img.width, img.height, img.mode)
+
+def _read_and_check(path, max_size, fmt):
+    """讀取檔案（在執行緒池中執行）；可原樣使用時直接回傳 PreparedImage"""
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        prepared = _try_passthrough(path, data, max_size, fmt)
+    except Exception:
+        prepared = None
+    return prepared, data
+
+def prepare_image(path, max_size=None, quality=75, fmt="jpeg"):
+    """
+    在目前程序中讀取並正規化單張圖片，參數同 normalize_image
+    
+    Returns:
+        PreparedImage: 可直接嵌入 PDF 的圖片
+    """
+    prepared, data = _read_and_check(path, max_size, fmt)
+    return prepared or normalize_image(path, data, max_size, quality, fmt)
+
+def iter_prepared_images(paths, workers=None, io_threads=4, max_size=None, quality=75, fmt="jpeg"):
+    """
+    平行讀取並正規化圖片，依輸入順序逐一產生結果
+    
+    讀檔使用執行緒池，解碼 / 轉換 / 縮小使用程序池；同時處理中的圖片數
+    受限於 workers 的數倍，記憶體用量不會隨圖片總數增加。
+    可原樣嵌入的 JPEG 不會送進程序池。
+    
+    Args:
+        paths (list): 圖片路徑（已排序）
+        workers (int, optional): 程序數，None 或 1 表示在目前程序中依序處理，0 表示使用所有核心
+        io_threads (int): 讀檔執行緒數
+        max_size (tuple, optional): 最大像素 (寬, 高)
+        quality (int): 重新編碼時的 JPEG 品質
+        fmt (str): "jpeg" 或 "auto"（見 normalize_image）
+    
+    Yields:
+        PreparedImage: 依 paths 順序的結果；處理失敗時產生 (path, 例外)
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    if not workers or workers <= 1:
+        for path in paths:
+            try:
+                prepared = prepare_image(path, max_size, quality, fmt)
+            except Exception as e:
+                yield path, e
+                continue
+            yield prepared
+        return
+    
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=io_threads) as readers, \
+            ProcessPoolExecutor(max_workers=workers) as decoders:
+        
+        def submit(path):
+            # 讀檔完成後，需要解碼的圖片直接在回呼中送進程序池
+            result = Future()
+            
+            def on_decoded(decode_future):
+                try:
+                    result.set_result(decode_future.result())
+                except Exception as e:
+                    result.set_exception(e)
+            
+            def on_read(read_future):
+                try:
+                    prepared, data = read_future.result()
+                    if prepared is not None:
+                        result.set_result(prepared)
+                    else:
+                        decoders.submit(normalize_image, path, data, max_size, quality, fmt) \
+                            .add_done_callback(on_decoded)
+                except Exception as e:
+                    result.set_exception(e)
+            
+            readers.submit(_read_and_check, path, max_size, fmt).add_done_callback(on_read)
+            return path, result
+        
+        pending = deque()
+        path_iter = iter(paths)
+        for path in path_iter:
+            pending.append(submit(path))
+            if len(pending) >= window:
+                break
+        
+        # 依輸入順序取出結果，每取出一張就補送一張，維持固定的處理中數量
+        while pending:
+            path, result = pending.popleft()
+            try:
+                prepared = result.result()
+            except Exception as e:
+                prepared = (path, e)
+            yield prepared
+            path = next(path_iter, None)
+            if path is not None:
+                pending.append(submit(path))
\ No newline at end of file
@@ -1,15 +1,148 @@
-from PIL import Image
 import os
 from glob import glob
+from image_pipeline import iter_prepared_images, prepare_image
 
-def convert_images_to_pdf(image_folder, output_pdf, image_types=("*.jpg", "*.jpeg", "*.png")):
+class StreamingPDFWriter:
     """
-    使用 Pillow 將資料夾中的圖片合併為單一 PDF 檔案
+    逐頁寫入圖片的 PDF 寫入器
+    
+    每加入一張圖片就立即把圖片、內容串流與頁面物件寫入檔案，
+    只在記憶體保留各物件的位移，記憶體用量與圖片數量無關。
+    JPEG 檔案以 DCTDecode 原樣嵌入，不重新編碼；EXIF 方向以頁面 /Rotate 表示。
+    內容先寫入同一資料夾的暫存檔，close() 完成後才取代 output_pdf；
+    發生例外或呼叫 discard() 時刪除暫存檔，不會留下不完整的 PDF。
+    
+    Args:
+        output_pdf (str): 輸出 PDF 檔案的路徑
+    """
+    def __init__(self, output_pdf):
+        self.output_pdf = output_pdf
+        self._temp_path = f"{output_pdf}.{os.getpid()}.tmp"
+        self._file = open(self._temp_path, "wb")
+        self._offsets = {}
+        self._page_ids = []
+        # 1 號物件為 Catalog，2 號為頁面樹，其餘依序配置
+        self._next_id = 3
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    
+    @property
+    def page_count(self):
+        return len(self._page_ids)
+    
+    def _allocate(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+    
+    def _write_object(self, obj_id, dictionary, stream=None):
+        self._offsets[obj_id] = self._file.tell()
+        self._file.write(f"{obj_id} 0 obj\n".encode("ascii"))
+        self._file.write(dictionary.encode("ascii"))
+        if stream is not None:
+            self._file.write(b"\nstream\n")
+            self._file.write(stream)
+            self._file.write(b"\nendstream")
+        self._file.write(b"\nendobj\n")
+    
+    def _add_page(self, image_dict, image_data, width, height, resolution, rotate=0):
+        image_id = self._allocate()
+        content_id = self._allocate()
+        page_id = self._allocate()
+        
+        # 頁面大小依解析度換算為點 (1/72 英吋)
+        page_width = width * 72.0 / resolution
+        page_height = height * 72.0 / resolution
+        
+        self._write_object(image_id, f"<< {image_dict} /Length {len(image_data)} >>", image_data)
+        content = f"q {page_width:.4f} 0 0 {page_height:.4f} 0 0 cm /Im0 Do Q".encode("ascii")
+        self._write_object(content_id, f"<< /Length {len(content)} >>", content)
+        rotate_entry = f" /Rotate {rotate}" if rotate else ""
+        self._write_object(
+            page_id,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width:.4f} {page_height:.4f}]{rotate_entry}"
+            f" /Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        self._page_ids.append(page_id)
+    
+    def add_prepared(self, prepared, resolution=100.0):
+        """
+        加入一張已正規化的 JPEG 圖片 (image_pipeline.PreparedImage) 為新頁面
+        
+        Args:
+            prepared (PreparedImage): fmt 為 "jpeg" 的圖片
+            resolution (float): 圖片解析度 (dpi)，決定頁面大小
+        """
+        colorspaces = {"L": "/DeviceGray", "RGB": "/DeviceRGB", "CMYK": "/DeviceCMYK"}
+        if prepared.fmt != "jpeg":
+            raise ValueError(f"只支援 JPEG 圖片: {prepared.path}")
+        
+        image_dict = (f"/Type /XObject /Subtype /Image /Width {prepared.width} /Height {prepared.height}"
+                      f" /ColorSpace {colorspaces[prepared.mode]} /BitsPerComponent 8 /Filter /DCTDecode")
+        if prepared.mode == "CMYK":
+            # Adobe 產生的 CMYK JPEG 為反相儲存
+            image_dict += " /Decode [1 0 1 0 1 0 1 0]"
+        self._add_page(image_dict, prepared.data, prepared.width, prepared.height, resolution, prepared.rotate)
+    
+    def add_image_file(self, image_file, resolution=100.0, quality=75):
+        """
+        加入一張圖片為新頁面
+        
+        JPEG (灰階、RGB、CMYK) 直接嵌入原始資料；其他格式轉為 RGB 後以 JPEG 編碼，
+        與 Pillow 儲存 PDF 時的做法相同。
+        
+        Args:
+            image_file (str): 圖片路徑
+            resolution (float): 圖片解析度 (dpi)，決定頁面大小
+            quality (int): 非 JPEG 圖片重新編碼時的 JPEG 品質
+        """
+        self.add_prepared(prepare_image(image_file, quality=quality), resolution)
+    
+    def close(self):
+        """寫入頁面樹、Catalog 與 xref 表，關閉檔案並移到 output_pdf"""
+        if self._file.closed:
+            return
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>")
+        self._write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+        
+        xref_offset = self._file.tell()
+        self._file.write(f"xref\n0 {self._next_id}\n".encode("ascii"))
+        self._file.write(b"0000000000 65535 f \n")
+        for obj_id in range(1, self._next_id):
+            self._file.write(f"{self._offsets[obj_id]:010d} 00000 n \n".encode("ascii"))
+        self._file.write(
+            f"trailer\n<< /Size {self._next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("ascii")
+        )
+        self._file.close()
+        os.replace(self._temp_path, self.output_pdf)
+    
+    def discard(self):
+        """放棄已寫入的內容，不建立 output_pdf"""
+        if not self._file.closed:
+            self._file.close()
+            os.remove(self._temp_path)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+def convert_images_to_pdf(image_folder, output_pdf, image_types=("*.jpg", "*.jpeg", "*.png"),
+                          resolution=100.0, quality=75, workers=None):
+    """
+    將資料夾中的圖片逐張串流合併為單一 PDF 檔案
     
     Args:
         image_folder (str): 圖片所在資料夾路徑
         output_pdf (str): 輸出 PDF 檔案的路徑
         image_types (tuple): 要包含的圖片類型
+        resolution (float): 圖片解析度 (dpi)，決定頁面大小
+        quality (int): 非 JPEG 圖片重新編碼時的 JPEG 品質
+        workers (int, optional): 解碼 / 轉換圖片的程序數，None 或 1 表示依序處理，0 表示使用所有核心
     """
     # 獲取所有符合條件的圖片路徑
     image_files = []
@@ -24,35 +157,32 @@ def convert_images_to_pdf(image_folder, output_pdf, image_types=("*.jpg", "*.jpe
         print(f"在 {image_folder} 中找不到圖片檔案")
         return
     
-    # 開啟所有圖片
-    images = []
-    for image_file in image_files:
-        img = Image.open(image_file)
-        # 如果不是 RGB 模式 (例如 PNG 的 RGBA)，轉換為 RGB
-        if img.mode != "RGB":
-            img = img.convert("RGB")
-        images.append(img)
-    
-    # 使用第一張圖片的格式儲存所有圖片為 PDF
-    if images:
-        first_image = images[0]
-        other_images = images[1:] if len(images) > 1 else []
-        first_image.save(
-            output_pdf, 
-            "PDF", 
-            resolution=100.0, 
-            save_all=True,
-            append_images=other_images
-        )
-        print(f"已將 {len(images)} 張圖片合併為 PDF: {output_pdf}")
-        print(f"已包含的圖片: {[os.path.basename(f) for f in image_files]}")
+    # 圖片在背景平行解碼，依檔名順序逐張寫入檔案
+    added = []
+    with StreamingPDFWriter(output_pdf) as writer:
+        for prepared in iter_prepared_images(image_files, workers=workers, quality=quality):
+            if isinstance(prepared, tuple):
+                image_file, error = prepared
+                print(f"處理圖片 {image_file} 時發生錯誤: {error}")
+                continue
+            writer.add_prepared(prepared, resolution)
+            added.append(prepared.path)
+        if not added:
+            writer.discard()
+    
+    if not added:
+        print(f"沒有任何圖片成功轉換，未建立 PDF: {output_pdf}")
+        return
+    
+    print(f"已將 {len(added)} 張圖片合併為 PDF: {output_pdf}")
+    print(f"已包含的圖片: {[os.path.basename(f) for f in added]}")
 
 if __name__ == "__main__":
     # 圖片所在資料夾
-    image_folder = r"C:\Users\"
+    image_folder = r"C:\Users"
     
     # 輸出 PDF 檔案路徑
-    output_pdf = r"C:\Users\"
+    output_pdf = r"C:\Users"
     
     # 執行轉換
     convert_images_to_pdf(image_folder, output_pdf)
\ No newline at end of file
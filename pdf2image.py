@@ -1,13 +1,24 @@
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import os
 
-def convert_pdf_to_jpg(pdf_path, output_folder=None):
-    """將 PDF 檔案轉換為 JPG 圖片
+def iter_pdf_to_jpg(pdf_path, output_folder=None, dpi=300, window_size=10):
+    """逐批將 PDF 轉換為 JPG 圖片，每頁產生後立即儲存
+    
+    每次只用 first_page/last_page 轉換 window_size 頁，
+    記憶體峰值只和 window_size 有關，與文件總頁數無關。
     
     Args:
         pdf_path (str): PDF 檔案路徑
         output_folder (str): 輸出資料夾 (預設: 與 PDF 相同資料夾)
+        dpi (int): 輸出解析度
+        window_size (int): 每批轉換的頁數
+    
+    Yields:
+        str: 已儲存的圖片路徑（依頁碼順序）
     """
+    if window_size < 1:
+        raise ValueError("window_size 必須大於 0")
+    
     # 如果沒有指定輸出資料夾，使用 PDF 所在的資料夾
     if output_folder is None:
         output_folder = os.path.dirname(pdf_path)
@@ -18,15 +29,41 @@ def convert_pdf_to_jpg(pdf_path, output_folder=None):
     # 取得不含副檔名的 PDF 檔名
     pdf_filename = os.path.splitext(os.path.basename(pdf_path))[0]
     
-    # 轉換 PDF 為圖片
-    # Windows 用戶: 如需指定 poppler 路徑，加入 poppler_path="C:\\path\\to\\poppler\\bin" 參數
-    images = convert_from_path(pdf_path, dpi=300)
+    # 取得總頁數
+    page_count = pdfinfo_from_path(pdf_path)["Pages"]
+    
+    for first_page in range(1, page_count + 1, window_size):
+        last_page = min(first_page + window_size - 1, page_count)
+        
+        # 轉換這一批頁面
+        # Windows 用戶: 如需指定 poppler 路徑，加入 poppler_path="C:\\path\\to\\poppler\\bin" 參數
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page)
+        
+        # 儲存後立即釋放，避免整批圖片常駐記憶體
+        for offset in range(len(images)):
+            image = images[offset]
+            images[offset] = None
+            image_path = os.path.join(output_folder, f"{pdf_filename}_page_{first_page+offset}.jpg")
+            image.save(image_path, "JPEG")
+            image.close()
+            yield image_path
+
+def convert_pdf_to_jpg(pdf_path, output_folder=None, window_size=10):
+    """將 PDF 檔案轉換為 JPG 圖片
+    
+    Args:
+        pdf_path (str): PDF 檔案路徑
+        output_folder (str): 輸出資料夾 (預設: 與 PDF 相同資料夾)
+        window_size (int): 每批轉換的頁數，決定記憶體用量上限
     
-    # 儲存圖片
-    for i, image in enumerate(images):
-        image_path = os.path.join(output_folder, f"{pdf_filename}_page_{i+1}.jpg")
-        image.save(image_path, "JPEG")
+    Returns:
+        list: 已儲存的圖片路徑
+    """
+    image_paths = []
+    for image_path in iter_pdf_to_jpg(pdf_path, output_folder, window_size=window_size):
+        image_paths.append(image_path)
         print(f"已儲存 {image_path}")
+    return image_paths
 
 # 使用範例
 if __name__ == "__main__":
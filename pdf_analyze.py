@@ -0,0 +1,344 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from compress import compress_pdf_safe, image_display_dpi, is_optimizable_image
+from pdf_io import as_source, describe, is_path, open_document, read_bytes, source_size, write_bytes
+
+# FontDescriptor 中指向內嵌字型檔的欄位
+FONT_FILE_KEYS = ("FontFile", "FontFile2", "FontFile3")
+
+# 判斷壓縮策略的門檻 (佔檔案大小的比例)
+IMAGE_GAIN_THRESHOLD = 0.2
+FONT_GAIN_THRESHOLD = 0.3
+CLEANUP_GAIN_THRESHOLD = 0.05
+
+# 計算圖片顯示解析度時預設取樣的頁數
+DPI_SAMPLE_PAGES = 20
+
+def _font_files(pdf_document):
+    """
+    找出所有內嵌字型檔串流
+    
+    Returns:
+        dict: 字型檔 xref -> 是否為子集字型 (字型名稱帶有 "ABCDEF+" 前綴)
+    """
+    fonts = {}
+    for xref in range(1, pdf_document.xref_length()):
+        if pdf_document.xref_get_key(xref, "Type")[1] != "/FontDescriptor":
+            continue
+        font_name = pdf_document.xref_get_key(xref, "FontName")[1]
+        is_subset = len(font_name) > 8 and font_name[7] == "+"
+        for key in FONT_FILE_KEYS:
+            kind, value = pdf_document.xref_get_key(xref, key)
+            if kind == "xref":
+                fonts[int(value.split()[0])] = is_subset
+    return fonts
+
+def _int_key(pdf_document, xref, key):
+    """讀取整數欄位，間接物件會先解析參照；缺少或無法解析時回傳 None"""
+    kind, value = pdf_document.xref_get_key(xref, key)
+    try:
+        if kind == "xref":
+            value = pdf_document.xref_object(int(value.split()[0]), compressed=True)
+        return int(value)
+    except (ValueError, RuntimeError):
+        return None
+
+def _sample_pages(page_count, count):
+    """平均分布在整份文件中的頁碼 (從 0 開始)；count 為 None 或不少於總頁數時為所有頁面"""
+    if count is None or count >= page_count:
+        return list(range(page_count))
+    return sorted({i * page_count // count for i in range(count)})
+
+def analyze_pdf(pdf_path, target_dpi=150, dpi_pages=DPI_SAMPLE_PAGES):
+    """
+    掃描 PDF 的 xref 表，統計各類串流大小、圖片解析度與重複物件 (不轉換頁面)
+    
+    串流大小取自字典中的 /Length，只有大小、濾鏡與類型都相同的串流才讀取內容比對是否重複。
+    圖片顯示解析度需要解析頁面內容，只檢查平均取樣的 dpi_pages 頁；取樣頁面中沒有出現的
+    圖片，依取樣圖片中解析度過高的比例估計。
+    
+    Args:
+        pdf_path (str | bytes | memoryview | mmap | file): PDF 檔案路徑或記憶體中的 PDF
+        target_dpi (int): 判斷圖片是否解析度過高的基準
+        dpi_pages (int, optional): 計算圖片解析度時取樣的頁數，None 為所有頁面，0 為不計算
+    
+    Returns:
+        dict: 分析結果，包含 file_size、page_count、dpi_pages (實際檢查的頁數)、image_bytes、
+              font_bytes、content_bytes、other_bytes、uncompressed_bytes、duplicate_bytes、
+              unsubset_font_bytes、oversampled_image_bytes、lossless_image_bytes、
+              locked_image_bytes 與 images 清單
+    """
+    pdf_path = as_source(pdf_path)
+    report = {
+        "file_size": source_size(pdf_path),
+        "page_count": 0,
+        "dpi_pages": 0,
+        "image_bytes": 0,
+        "font_bytes": 0,
+        "content_bytes": 0,
+        "other_bytes": 0,
+        # 沒有任何壓縮濾鏡的串流
+        "uncompressed_bytes": 0,
+        # 內容相同的串流中，除了第一份以外的大小
+        "duplicate_bytes": 0,
+        "duplicate_objects": 0,
+        "unsubset_font_bytes": 0,
+        # 可由 compress.optimize_images 處理、解析度超過 target_dpi 的圖片
+        "oversampled_image_bytes": 0,
+        # 可由 compress.optimize_images 處理、以無損方式儲存的彩色 / 灰階圖片
+        "lossless_image_bytes": 0,
+        # 有遮罩等原因 optimize_images 不處理，但解析度過高或無損儲存的圖片
+        "locked_image_bytes": 0,
+        "images": [],
+    }
+    
+    pdf_document = open_document(pdf_path)
+    try:
+        report["page_count"] = pdf_document.page_count
+        content_xrefs = set()
+        for page in pdf_document:
+            content_xrefs.update(page.get_contents())
+        font_files = _font_files(pdf_document)
+        sampled = _sample_pages(pdf_document.page_count, dpi_pages)
+        report["dpi_pages"] = len(sampled)
+        display_dpi = image_display_dpi(pdf_document, sampled) if sampled else {}
+        dpi_complete = len(sampled) == pdf_document.page_count
+        
+        # (大小, 濾鏡, 類型) -> [xref, ...]，只有相同的串流才可能重複
+        candidates = {}
+        # 取樣頁面中沒有出現的可處理圖片: [(大小, 是否無損), ...]
+        unmeasured = []
+        measured_bytes = 0
+        measured_oversampled = 0
+        for xref in range(1, pdf_document.xref_length()):
+            if not pdf_document.xref_is_stream(xref):
+                continue
+            size = _int_key(pdf_document, xref, "Length")
+            if size is None:
+                size = len(pdf_document.xref_stream_raw(xref))
+            
+            stream_filter = pdf_document.xref_get_key(xref, "Filter")[1]
+            if stream_filter == "null":
+                report["uncompressed_bytes"] += size
+            
+            subtype = pdf_document.xref_get_key(xref, "Subtype")[1]
+            candidates.setdefault((size, stream_filter, subtype), []).append(xref)
+            if subtype == "/Image":
+                report["image_bytes"] += size
+                dpi = display_dpi.get(xref)
+                optimizable = is_optimizable_image(pdf_document, xref)
+                oversampled = dpi is not None and dpi > target_dpi * 1.1
+                lossless = "DCTDecode" not in stream_filter and "JPXDecode" not in stream_filter
+                if optimizable and dpi is not None:
+                    measured_bytes += size
+                    measured_oversampled += size if oversampled else 0
+                if optimizable and dpi is None and not dpi_complete:
+                    unmeasured.append((size, lossless))
+                elif optimizable and oversampled:
+                    report["oversampled_image_bytes"] += size
+                elif optimizable and lossless:
+                    report["lossless_image_bytes"] += size
+                elif not optimizable and (oversampled or lossless):
+                    report["locked_image_bytes"] += size
+                report["images"].append({
+                    "xref": xref,
+                    "width": _int_key(pdf_document, xref, "Width"),
+                    "height": _int_key(pdf_document, xref, "Height"),
+                    "filter": stream_filter,
+                    "bytes": size,
+                    "dpi": round(dpi, 1) if dpi is not None else None,
+                    "optimizable": optimizable,
+                })
+            elif xref in font_files:
+                report["font_bytes"] += size
+                if not font_files[xref]:
+                    report["unsubset_font_bytes"] += size
+            elif xref in content_xrefs or subtype == "/Form":
+                report["content_bytes"] += size
+            else:
+                report["other_bytes"] += size
+        
+        # 未取樣到的圖片依取樣圖片中解析度過高的比例估計
+        ratio = measured_oversampled / measured_bytes if measured_bytes else 0
+        for size, lossless in unmeasured:
+            report["oversampled_image_bytes"] += int(size * ratio)
+            if lossless:
+                report["lossless_image_bytes"] += size - int(size * ratio)
+        
+        for xrefs in candidates.values():
+            if len(xrefs) < 2:
+                continue
+            seen = set()
+            for xref in xrefs:
+                raw = pdf_document.xref_stream_raw(xref)
+                digest = hashlib.sha256(raw).digest()
+                if digest in seen:
+                    report["duplicate_bytes"] += len(raw)
+                    report["duplicate_objects"] += 1
+                seen.add(digest)
+    finally:
+        if pdf_document is not pdf_path:
+            pdf_document.close()
+    return report
+
+def recommend_strategy(report, ghostscript_available=True):
+    """
+    依分析結果選擇最便宜且可能有效的壓縮方式
+    
+    - "pymupdf-images": 有大量解析度過高或無損儲存的圖片，以 compress.optimize_images 處理
+    - "ghostscript": 主要可壓縮的部分是 optimize_images 不處理的圖片，或未子集化的字型
+    - "pymupdf": 只有未壓縮的串流或重複物件，garbage / deflate 即可
+    - "skip": 已經最佳化，壓縮不會明顯變小
+    
+    Args:
+        report (dict): analyze_pdf 的結果
+        ghostscript_available (bool): 是否可以使用 Ghostscript
+    
+    Returns:
+        tuple: (策略名稱, 原因說明)
+    """
+    file_size = max(report["file_size"], 1)
+    image_gain = (report["oversampled_image_bytes"] + report["lossless_image_bytes"]) / file_size
+    locked_gain = report["locked_image_bytes"] / file_size
+    font_gain = report["unsubset_font_bytes"] / file_size
+    cleanup_gain = (report["uncompressed_bytes"] + report["duplicate_bytes"]) / file_size
+    
+    if image_gain >= IMAGE_GAIN_THRESHOLD:
+        return "pymupdf-images", f"可重新壓縮的圖片佔 {image_gain:.0%}"
+    if ghostscript_available and locked_gain >= IMAGE_GAIN_THRESHOLD:
+        return "ghostscript", f"含遮罩等需 Ghostscript 處理的圖片佔 {locked_gain:.0%}"
+    if ghostscript_available and font_gain >= FONT_GAIN_THRESHOLD:
+        return "ghostscript", f"未子集化的字型佔 {font_gain:.0%}"
+    if cleanup_gain >= CLEANUP_GAIN_THRESHOLD:
+        return "pymupdf", f"未壓縮串流與重複物件佔 {cleanup_gain:.0%}"
+    return "skip", "檔案已最佳化，壓縮效果有限"
+
+def _ghostscript_available(gs_path):
+    if gs_path is not None:
+        return True
+    from ghostscript_compress import find_ghostscript
+    try:
+        find_ghostscript()
+        return True
+    except FileNotFoundError:
+        return False
+
+def compress_auto(input_pdf, output_pdf=None, target_dpi=150, jpeg_quality=75, gs_path=None,
+                  shard_pages=500, verbose=True):
+    """
+    先分析 PDF，再以建議的方式壓縮；已最佳化的檔案直接複製，不花費 CPU
+    
+    壓縮結果比原始檔大時改為保留原始檔內容。輸入可以是記憶體中的 PDF，輸出可以是串流
+    或直接回傳 bytes；Ghostscript 只能處理檔案，這時才經過暫存檔。
+    
+    Args:
+        input_pdf (str | bytes | memoryview | mmap | file): 輸入 PDF 檔案路徑或記憶體中的 PDF
+        output_pdf (str | file, optional): 輸出 PDF 檔案路徑或可寫入的串流；
+            未指定時，路徑輸入自動命名，記憶體輸入回傳 bytes
+        target_dpi (int): 圖片目標解析度
+        jpeg_quality (int): 圖片重新編碼的 JPEG 品質
+        gs_path (str, optional): Ghostscript 執行檔的完整路徑
+        shard_pages (int): 使用 Ghostscript 時，頁數達到此值改用分段平行壓縮
+        verbose (bool): 是否輸出分析結果
+    
+    Returns:
+        dict: strategy、reason、output (路徑、串流或 bytes)、original_size、compressed_size、kept_original
+    """
+    input_pdf = as_source(input_pdf)
+    if output_pdf is None and is_path(input_pdf):
+        file_name, file_ext = os.path.splitext(input_pdf)
+        output_pdf = f"{file_name}_compressed{file_ext}"
+    
+    report = analyze_pdf(input_pdf, target_dpi)
+    strategy, reason = recommend_strategy(report, _ghostscript_available(gs_path))
+    if verbose:
+        print(f"{os.path.basename(describe(input_pdf))}: {strategy} ({reason})")
+    
+    # 串流與 bytes 輸出先壓縮到記憶體，確定比原始檔小才寫出
+    to_file = is_path(output_pdf)
+    compressed = None
+    compressed_size = None
+    if strategy == "pymupdf":
+        compressed, _, compressed_size = compress_pdf_safe(input_pdf, output_pdf if to_file else None,
+                                                           "high", verbose=False)
+    elif strategy == "pymupdf-images":
+        compressed, _, compressed_size = compress_pdf_safe(input_pdf, output_pdf if to_file else None,
+                                                           "extreme", verbose=False,
+                                                           target_dpi=target_dpi, jpeg_quality=jpeg_quality)
+    elif strategy == "ghostscript":
+        from ghostscript_compress import compress_pdf_sharded, compress_pdf_with_ghostscript
+        with tempfile.TemporaryDirectory(prefix="pdf_auto_") as work_dir:
+            gs_input = input_pdf
+            if not is_path(gs_input):
+                gs_input = os.path.join(work_dir, "input.pdf")
+                write_bytes(read_bytes(input_pdf), gs_input)
+            gs_output = output_pdf if to_file else os.path.join(work_dir, "output.pdf")
+            if report["page_count"] >= shard_pages:
+                compress_pdf_sharded(gs_input, gs_output, gs_path=gs_path, image_resolution=target_dpi,
+                                     jpeg_quality=jpeg_quality, verbose=False)
+            else:
+                compress_pdf_with_ghostscript(gs_input, gs_output, gs_path=gs_path, image_resolution=target_dpi,
+                                              jpeg_quality=jpeg_quality, verbose=False)
+            compressed_size = os.path.getsize(gs_output)
+            if not to_file:
+                compressed = read_bytes(gs_output)
+    
+    original_size = report["file_size"]
+    kept_original = strategy != "skip" and compressed_size >= original_size
+    if strategy == "skip" or kept_original:
+        if is_path(input_pdf) and to_file:
+            shutil.copyfile(input_pdf, output_pdf)
+            output = output_pdf
+        else:
+            output, _ = write_bytes(read_bytes(input_pdf), output_pdf)
+        compressed_size = original_size
+    elif to_file:
+        output = output_pdf
+    else:
+        output, _ = write_bytes(compressed, output_pdf)
+    
+    return {
+        "strategy": strategy,
+        "reason": reason,
+        "output": output,
+        "original_size": original_size,
+        "compressed_size": compressed_size,
+        "kept_original": kept_original,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="分析 PDF 組成並選擇壓縮方式")
+    parser.add_argument("pdf", help="PDF 檔案")
+    parser.add_argument("--target-dpi", type=int, default=150, help="圖片目標解析度")
+    parser.add_argument("--dpi-pages", type=int, default=DPI_SAMPLE_PAGES,
+                        help="計算圖片解析度時取樣的頁數 (0 為不計算)")
+    parser.add_argument("--all-pages", action="store_true", help="檢查所有頁面的圖片解析度")
+    parser.add_argument("--compress", action="store_true", help="依建議的方式壓縮")
+    parser.add_argument("--output", help="壓縮後的輸出檔案")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出完整分析結果")
+    args = parser.parse_args()
+    
+    report = analyze_pdf(args.pdf, args.target_dpi, None if args.all_pages else args.dpi_pages)
+    strategy, reason = recommend_strategy(report, _ghostscript_available(None))
+    if args.json:
+        print(json.dumps(dict(report, strategy=strategy, reason=reason), ensure_ascii=False, indent=2))
+    else:
+        mb = 1024 * 1024
+        print(f"檔案大小: {report['file_size'] / mb:.2f} MB，{report['page_count']} 頁")
+        print(f"圖片: {report['image_bytes'] / mb:.2f} MB ({len(report['images'])} 個)")
+        print(f"字型: {report['font_bytes'] / mb:.2f} MB")
+        print(f"內容串流: {report['content_bytes'] / mb:.2f} MB")
+        print(f"其他: {report['other_bytes'] / mb:.2f} MB")
+        print(f"重複物件: {report['duplicate_objects']} 個，{report['duplicate_bytes'] / mb:.2f} MB")
+        print(f"建議: {strategy} ({reason})")
+    
+    if args.compress:
+        result = compress_auto(args.pdf, args.output, args.target_dpi, verbose=False)
+        print(f"輸出檔案: {result['output']} ({result['compressed_size'] / (1024 * 1024):.2f} MB)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
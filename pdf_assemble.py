@@ -0,0 +1,115 @@
+import fitz  # PyMuPDF
+from pdf_io import open_document, save_document
+
+def _open_copy(source):
+    """開啟來源文件的獨立副本，不影響原本開啟的文件"""
+    if not isinstance(source, fitz.Document):
+        # 路徑或記憶體資料：各自開啟一份即可，記憶體資料不會被複製
+        return open_document(source)
+    if source.name:
+        # 從檔案重新開啟只會讀取 xref，比序列化整份文件便宜
+        return fitz.open(source.name)
+    if source.stream is not None and not source.is_dirty:
+        # 從記憶體開啟且未修改的文件，共用同一份資料重新開啟
+        return open_document(source.stream)
+    return fitz.open("pdf", source.tobytes())
+
+def _contiguous_runs(page_order):
+    """將頁碼序列切成連續遞增或遞減的區段 [(from_page, to_page), ...]"""
+    runs = []
+    for page in page_order:
+        if runs:
+            start, end = runs[-1]
+            step = 1 if end >= start else -1
+            if start == end and abs(page - end) == 1:
+                runs[-1] = (start, page)
+                continue
+            if start != end and page == end + step:
+                runs[-1] = (start, page)
+                continue
+        runs.append((page, page))
+    return runs
+
+def assemble_pages(source, page_order, method="select"):
+    """
+    依頁碼順序一次組出新的 PDF 文件
+    
+    Args:
+        source (str, bytes or fitz.Document): 來源 PDF 路徑、記憶體中的 PDF 或已開啟的文件
+        page_order (list): 新文件的頁碼順序 (從 0 開始，可重複)
+        method (str): "select" 使用 Document.select() 在副本上一次重排頁面；
+            "graft" 以連續區段呼叫 insert_pdf，同一份輸出內共用 graft map，
+            共用的字型、圖片只會寫入一次
+    
+    Returns:
+        fitz.Document: 組好的新文件，呼叫端負責儲存與關閉
+    """
+    page_order = list(page_order)
+    if not page_order:
+        raise ValueError("頁碼順序不可為空")
+    
+    if method == "select":
+        new_pdf = _open_copy(source)
+        new_pdf.select(page_order)
+        return new_pdf
+    
+    if method == "graft":
+        source_pdf = open_document(source)
+        new_pdf = fitz.open()
+        for from_page, to_page in _contiguous_runs(page_order):
+            new_pdf.insert_pdf(source_pdf, from_page=from_page, to_page=to_page)
+        if source_pdf is not source:
+            source_pdf.close()
+        return new_pdf
+    
+    raise ValueError("method 必須是 'select' 或 'graft'")
+
+def save_pages(source, page_order, output_path=None, method="select", **save_options):
+    """
+    依頁碼順序組出新文件並儲存
+    
+    Args:
+        source (str, bytes or fitz.Document): 來源 PDF 路徑、記憶體中的 PDF 或已開啟的文件
+        page_order (list): 新文件的頁碼順序 (從 0 開始，可重複)
+        output_path (str or file, optional): 輸出 PDF 檔案路徑或可寫入的串流，None 時回傳 bytes
+        method (str): 見 assemble_pages
+        **save_options: 傳給 Document.save() 的參數，預設 garbage=1
+            以移除未被選取頁面留下的物件
+    
+    Returns:
+        輸出路徑、串流，或 output_path 為 None 時的 PDF bytes
+    """
+    save_options.setdefault("garbage", 1)
+    new_pdf = assemble_pages(source, page_order, method)
+    try:
+        result, _ = save_document(new_pdf, output_path, **save_options)
+    finally:
+        new_pdf.close()
+    return result
+
+def merge_pdfs(sources, output_path=None, **save_options):
+    """
+    依序合併多個 PDF
+    
+    Args:
+        sources (list): 來源 PDF，可混用路徑、記憶體中的 PDF 與已開啟的文件
+        output_path (str or file, optional): 輸出 PDF 檔案路徑或可寫入的串流，None 時回傳 bytes
+        **save_options: 傳給 Document.save() 的參數，預設 garbage=1
+    
+    Returns:
+        輸出路徑、串流，或 output_path 為 None 時的 PDF bytes
+    """
+    save_options.setdefault("garbage", 1)
+    merged = fitz.open()
+    try:
+        for source in sources:
+            source_pdf = open_document(source)
+            try:
+                merged.insert_pdf(source_pdf)
+            finally:
+                if source_pdf is not source:
+                    source_pdf.close()
+        result, _ = save_document(merged, output_path, **save_options)
+    finally:
+        merged.close()
+    return result
\ No newline at end of file
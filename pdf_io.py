@@ -0,0 +1,136 @@
+import io
+import mmap
+import os
+import fitz  # PyMuPDF
+
+def is_path(source):
+    """source 是否為檔案路徑"""
+    return isinstance(source, (str, os.PathLike))
+
+def as_buffer(source):
+    """
+    將記憶體中的 PDF 轉為 memoryview，盡量不複製資料
+    
+    Args:
+        source: bytes、bytearray、memoryview、mmap、io.BytesIO 或可讀取的檔案物件。
+            有 fileno() 的檔案以唯讀 mmap 對應，不讀入記憶體
+    
+    Returns:
+        memoryview: PDF 內容
+    """
+    if isinstance(source, memoryview):
+        return source
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        return memoryview(source)
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer()
+    if hasattr(source, "read"):
+        try:
+            fileno = source.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return memoryview(source.read())
+        return memoryview(mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+    raise TypeError(f"不支援的 PDF 來源: {type(source).__name__}")
+
+def as_source(source):
+    """
+    路徑與已開啟的文件原樣回傳，其他來源轉為 memoryview
+    
+    檔案物件只能讀取一次，需要多次使用同一個來源 (例如先分析再壓縮) 時先呼叫。
+    """
+    if is_path(source) or isinstance(source, fitz.Document):
+        return source
+    return as_buffer(source)
+
+def open_document(source):
+    """
+    開啟 PDF，來源可以是路徑、記憶體資料或已開啟的文件
+    
+    記憶體資料直接交給 fitz.open(stream=...)，不寫入暫存檔。
+    
+    Args:
+        source: 檔案路徑、fitz.Document，或 as_buffer 支援的任何型別
+    
+    Returns:
+        fitz.Document: 開啟的文件；source 本身是文件時原樣回傳
+    """
+    if isinstance(source, fitz.Document):
+        return source
+    if is_path(source):
+        return fitz.open(source)
+    return fitz.open(stream=as_buffer(source), filetype="pdf")
+
+def source_size(source):
+    """來源 PDF 的大小 (bytes)"""
+    if is_path(source):
+        return os.path.getsize(source)
+    if isinstance(source, fitz.Document):
+        return os.path.getsize(source.name) if source.name else len(source.tobytes())
+    return as_buffer(source).nbytes
+
+def describe(source):
+    """用於訊息輸出的來源說明"""
+    if is_path(source):
+        return os.fspath(source)
+    if isinstance(source, fitz.Document) and source.name:
+        return source.name
+    return f"<記憶體中的 PDF, {source_size(source)} bytes>"
+
+def read_bytes(source):
+    """來源 PDF 的完整內容 (bytes)"""
+    if is_path(source):
+        with open(source, "rb") as f:
+            return f.read()
+    if isinstance(source, fitz.Document):
+        if source.stream is not None and not source.is_dirty:
+            return bytes(source.stream)
+        return source.tobytes()
+    return bytes(as_buffer(source))
+
+def write_bytes(data, target=None):
+    """
+    將 PDF 資料寫到路徑或可寫入的串流，target 為 None 時直接回傳
+    
+    Returns:
+        tuple: (結果, 寫入的 bytes 數)；結果為路徑、串流或 bytes
+    """
+    if target is None:
+        return bytes(data), len(data)
+    if is_path(target):
+        with open(target, "wb") as f:
+            f.write(data)
+    else:
+        target.write(data)
+    return target, len(data)
+
+def _is_own_file(pdf_document, path):
+    """path 是否為文件開啟時讀取的檔案"""
+    return bool(pdf_document.name) and os.path.exists(path) and os.path.samefile(path, pdf_document.name)
+
+def save_document(pdf_document, target=None, **save_options):
+    """
+    儲存文件到路徑、可寫入的串流，或直接回傳 bytes
+    
+    Args:
+        pdf_document (fitz.Document): 要儲存的文件
+        target: 輸出路徑、有 write() 的串流，None 表示回傳 bytes
+        **save_options: 傳給 Document.save() / tobytes() 的參數
+    
+    Returns:
+        tuple: (結果, 寫入的 bytes 數)；結果為路徑、串流或 bytes
+    """
+    if target is None:
+        data = pdf_document.tobytes(**save_options)
+        return data, len(data)
+    if is_path(target):
+        if not _is_own_file(pdf_document, target):
+            pdf_document.save(target, **save_options)
+            return target, os.path.getsize(target)
+        # 儲存到文件本身開啟的檔案時 PyMuPDF 只允許增量儲存，先序列化到記憶體再覆寫
+        data = pdf_document.tobytes(**save_options)
+        with open(target, "wb") as f:
+            f.write(data)
+        return target, len(data)
+    data = pdf_document.tobytes(**save_options)
+    target.write(data)
+    return target, len(data)
\ No newline at end of file
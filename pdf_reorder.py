@@ -1,9 +1,186 @@
+import multiprocessing
 import os
+import queue
+import threading
+import time
 import tkinter as tk
+from collections import OrderedDict
 from tkinter import filedialog, messagebox, ttk, simpledialog
 import fitz  # PyMuPDF
 from PIL import Image, ImageTk
-import io
+from image_encoder import encode_pixmap, pixmap_to_image
+from pdf_assemble import save_pages
+from pdf_split import parse_page_ranges, split_pdf
+from render_cache import RenderCache, file_hash
+
+# 縮圖縮放比例、記憶體中最多保留的縮圖數，以及可見範圍外預先載入的頁數
+THUMBNAIL_SCALE = 0.3
+THUMBNAIL_CACHE_SIZE = 200
+THUMBNAIL_PREFETCH = 20
+# 轉換中的頁面已不再需要時，最多再等待的秒數，超過則結束子程序重新啟動
+RENDER_CANCEL_TIMEOUT = 0.5
+
+def render_page_image(pdf_document, page_num, scale, cache=None, doc_hash=None):
+    """
+    轉換頁面為 PIL 圖片，有提供快取時優先使用快取
+    
+    Args:
+        pdf_document (fitz.Document): PDF 文件
+        page_num (int): 原始頁碼 (從 0 開始)
+        scale (float): 縮放比例
+        cache (RenderCache, optional): 頁面轉換結果快取
+        doc_hash (str, optional): PDF 內容雜湊
+    """
+    key = None
+    if cache is not None and doc_hash is not None:
+        key = cache.make_key(doc_hash, page_num, scale, "rgb", "png")
+        cached_path = cache.get(key)
+        if cached_path:
+            with Image.open(cached_path) as img:
+                img.load()
+                return img
+    
+    page = pdf_document[page_num]
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+    if key is not None:
+        cache.put_bytes(key, encode_pixmap(pix, fmt="png"))
+    # 複製一份，讓圖片不依賴 Pixmap 的記憶體
+    return pixmap_to_image(pix).copy()
+
+def _render_process(conn, pdf_path, scale, cache, doc_hash):
+    """
+    子程序：依序接收頁碼並回傳轉換結果，收到 None 時結束
+    
+    回傳 (頁碼, (模式, 大小, 像素資料), None) 或 (頁碼, None, 錯誤訊息)。
+    """
+    pdf_document = fitz.open(pdf_path)
+    try:
+        while True:
+            page_num = conn.recv()
+            if page_num is None:
+                return
+            try:
+                img = render_page_image(pdf_document, page_num, scale, cache, doc_hash)
+            except Exception as e:
+                conn.send((page_num, None, str(e)))
+                continue
+            conn.send((page_num, (img.mode, img.size, img.tobytes()), None))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        pdf_document.close()
+
+class PageRenderWorker(threading.Thread):
+    """
+    在子程序轉換頁面圖片
+    
+    get_pixmap 在轉換期間不會釋放 GIL，且 fitz 文件不可跨執行緒使用，
+    因此實際轉換在獨立的子程序中進行；這個執行緒只負責排程與等待結果，
+    不呼叫任何 fitz 函式，主執行緒的介面不會因複雜的頁面而停頓。
+    每次 request() 都會取代尚未處理的請求，只轉換目前需要的頁面；轉換中的頁面
+    不在新的請求中且超過 RENDER_CANCEL_TIMEOUT 仍未完成時，結束並重新啟動子程序。轉換結果
+    (頁碼, PIL 圖片, 錯誤訊息) 放入 results 佇列，由主執行緒取出後建立 PhotoImage。
+    
+    Args:
+        pdf_path (str): PDF 檔案路徑
+        scale (float): 縮放比例
+        cache (RenderCache, optional): 頁面轉換結果快取
+        doc_hash (str, optional): PDF 內容雜湊
+    """
+    def __init__(self, pdf_path, scale, cache=None, doc_hash=None):
+        super().__init__(daemon=True)
+        self.pdf_path = pdf_path
+        self.scale = scale
+        self.cache = cache
+        self.doc_hash = doc_hash
+        self.results = queue.Queue()
+        self._pending = []
+        self._wanted = set()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._conn = None
+        self._process = None
+    
+    def _spawn(self):
+        """啟動轉換子程序"""
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_render_process,
+            args=(child_conn, self.pdf_path, self.scale, self.cache, self.doc_hash),
+            daemon=True
+        )
+        self._process.start()
+        # 只留子程序持有另一端，子程序結束時 recv() 才會收到 EOFError
+        child_conn.close()
+    
+    def start(self):
+        self._spawn()
+        super().start()
+    
+    def request(self, page_nums):
+        """以新的頁碼列表（依優先順序）取代尚未處理的請求"""
+        with self._condition:
+            self._pending = list(page_nums)
+            self._wanted = set(self._pending)
+            self._condition.notify()
+    
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._pending = []
+            self._condition.notify()
+            # 不等待轉換中的頁面完成，直接結束子程序
+            if self._process is not None and self._process.is_alive():
+                self._process.terminate()
+    
+    def _wait_result(self, page_num):
+        """
+        等待子程序回傳轉換結果
+        
+        Returns:
+            tuple | None: 子程序的回傳值；頁面已不再需要而取消轉換時為 None
+        """
+        started = time.monotonic()
+        while not self._conn.poll(0.05):
+            if time.monotonic() - started < RENDER_CANCEL_TIMEOUT:
+                continue
+            with self._condition:
+                if self._stopped or page_num in self._wanted:
+                    continue
+                # 轉換無法中途取消，只能結束子程序再重新啟動
+                self._process.terminate()
+                self._process.join(1)
+                self._conn.close()
+                self._spawn()
+            return None
+        return self._conn.recv()
+    
+    def run(self):
+        try:
+            while True:
+                with self._condition:
+                    while not self._pending and not self._stopped:
+                        self._condition.wait()
+                    if self._stopped:
+                        return
+                    page_num = self._pending.pop(0)
+                # 等待子程序時不持有 GIL
+                self._conn.send(page_num)
+                result = self._wait_result(page_num)
+                if result is None:
+                    continue
+                page_num, pixels, error = result
+                if pixels is None:
+                    print(f"無法創建頁面 {page_num+1} 的預覽: {error}")
+                    self.results.put((page_num, None, error))
+                    continue
+                mode, size, data = pixels
+                self.results.put((page_num, Image.frombytes(mode, size, data), None))
+        except (EOFError, OSError):
+            # stop() 結束了子程序
+            return
+        finally:
+            self._conn.close()
 
 class SplitPDFDialog(tk.Toplevel):
     def __init__(self, parent, callback):
@@ -148,27 +325,7 @@ class SplitPDFDialog(tk.Toplevel):
     
     def parse_range(self, range_text):
         # 解析頁面範圍字串，例如 "1-3,5,7-9"
-        page_ranges = []
-        parts = range_text.split(",")
-        
-        for part in parts:
-            part = part.strip()
-            if "-" in part:
-                # 處理範圍，例如 "1-3"
-                start, end = part.split("-")
-                start = int(start.strip())
-                end = int(end.strip())
-                if start < 1 or end < start:
-                    raise ValueError(f"無效的頁面範圍: {part}")
-                page_ranges.append((start-1, end-1))  # 轉換為從 0 開始的索引
-            else:
-                # 處理單頁，例如 "5"
-                page = int(part.strip())
-                if page < 1:
-                    raise ValueError(f"無效的頁面: {part}")
-                page_ranges.append((page-1, page-1))  # 轉換為從 0 開始的索引
-        
-        return page_ranges
+        return parse_page_ranges(range_text)
 
 
 class PDFReorderApp:
@@ -181,8 +338,22 @@ class PDFReorderApp:
         # 設定變數
         self.current_pdf = None
         self.pages = []
-        self.page_images = []
         self.selected_index = None
+        self.doc_hash = None
+        
+        # 頁面預覽快取，重複開啟同一份文件時不必重新轉換
+        self.render_cache = RenderCache()
+        
+        # 記憶體中的縮圖 (原始頁碼 -> PhotoImage)，依最近使用順序排列
+        self.page_images = OrderedDict()
+        self.thumbnail_worker = None
+        self._thumbnail_request_pending = False
+        
+        # 完整解析度預覽在另一個背景執行緒轉換，不與縮圖互相排隊
+        self.preview_worker = None
+        self.preview_page = None
+        self.preview_full = False
+        self.current_preview = None
         
         # 建立界面
         self.create_ui()
@@ -217,13 +388,13 @@ class PDFReorderApp:
         list_frame = ttk.Frame(pages_frame)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        scrollbar = ttk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.page_scrollbar = ttk.Scrollbar(list_frame)
+        self.page_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         self.page_list = tk.Listbox(list_frame, selectmode=tk.SINGLE, activestyle='none',
-                                   yscrollcommand=scrollbar.set, font=("Arial", 10))
+                                   yscrollcommand=self.on_page_list_scroll, font=("Arial", 10))
         self.page_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=self.page_list.yview)
+        self.page_scrollbar.config(command=self.page_list.yview)
         
         # 頁面列表選擇事件
         self.page_list.bind('<<ListboxSelect>>', self.on_page_select)
@@ -282,7 +453,7 @@ class PDFReorderApp:
             # 開啟 PDF 檔案
             self.current_pdf = fitz.open(pdf_file)
             self.pages = list(range(len(self.current_pdf)))
-            self.page_images = []
+            self.doc_hash = file_hash(pdf_file)
             
             # 更新狀態
             self.status_var.set(f"已開啟: {os.path.basename(pdf_file)} ({len(self.current_pdf)} 頁)")
@@ -300,24 +471,113 @@ class PDFReorderApp:
             messagebox.showerror("錯誤", f"無法開啟 PDF 檔案: {str(e)}")
     
     def load_page_previews(self):
-        # 清空現有的頁面預覽
-        self.page_images = []
+        # 清空現有的頁面預覽，縮圖改為依可見範圍在背景載入；
+        # 縮圖與完整預覽各有一個轉換子程序，本程序中只有主執行緒使用 fitz
+        self.page_images.clear()
+        self.preview_page = None
+        self.preview_full = False
+        for worker in (self.thumbnail_worker, self.preview_worker):
+            if worker:
+                worker.stop()
+        self.thumbnail_worker = None
+        self.preview_worker = None
         
         if not self.current_pdf:
             return
         
-        # 為每頁創建預覽圖
-        for page_num in self.pages:
+        self.thumbnail_worker = PageRenderWorker(
+            self.current_pdf.name, THUMBNAIL_SCALE, self.render_cache, self.doc_hash
+        )
+        self.thumbnail_worker.start()
+        self.poll_thumbnails(self.thumbnail_worker)
+        self.request_visible_thumbnails()
+        
+        self.preview_worker = PageRenderWorker(self.current_pdf.name, 1, self.render_cache, self.doc_hash)
+        self.preview_worker.start()
+        self.poll_previews(self.preview_worker)
+    
+    def on_page_list_scroll(self, first, last):
+        # 更新滾動條，並在下一次閒置時載入新可見範圍的縮圖
+        self.page_scrollbar.set(first, last)
+        if not self._thumbnail_request_pending:
+            self._thumbnail_request_pending = True
+            self.root.after_idle(self.request_visible_thumbnails)
+    
+    def request_visible_thumbnails(self):
+        # 只請求可見範圍附近、尚未載入的縮圖；可見的頁面優先
+        self._thumbnail_request_pending = False
+        if not self.thumbnail_worker or not self.pages:
+            return
+        
+        first_visible = self.page_list.nearest(0)
+        last_visible = self.page_list.nearest(self.page_list.winfo_height())
+        start = max(0, first_visible - THUMBNAIL_PREFETCH)
+        end = min(len(self.pages), last_visible + THUMBNAIL_PREFETCH + 1)
+        
+        order = list(range(first_visible, last_visible + 1))
+        order += [i for i in range(start, end) if i < first_visible or i > last_visible]
+        if self.selected_index is not None and self.selected_index < len(self.pages):
+            order.insert(0, self.selected_index)
+        
+        wanted = []
+        for index in order:
+            page_num = self.pages[index]
+            if page_num in self.page_images:
+                self.page_images.move_to_end(page_num)
+            elif page_num not in wanted:
+                wanted.append(page_num)
+        self.thumbnail_worker.request(wanted)
+    
+    def poll_thumbnails(self, worker):
+        # 在主執行緒取出背景轉換好的縮圖並建立 PhotoImage
+        if worker is not self.thumbnail_worker:
+            return
+        while True:
             try:
-                page = self.current_pdf[page_num]
-                pix = page.get_pixmap(matrix=fitz.Matrix(0.3, 0.3))  # 縮小預覽圖
-                img_data = pix.tobytes("ppm")
-                img = Image.open(io.BytesIO(img_data))
-                self.page_images.append(ImageTk.PhotoImage(img))
-            except Exception as e:
-                # 如果無法創建預覽，添加一個空白圖像
-                self.page_images.append(None)
-                print(f"無法創建頁面 {page_num+1} 的預覽: {str(e)}")
+                page_num, img, _ = worker.results.get_nowait()
+            except queue.Empty:
+                break
+            self.page_images[page_num] = ImageTk.PhotoImage(img) if img else None
+            self.page_images.move_to_end(page_num)
+            # 超過上限時丟棄最久未使用的縮圖
+            while len(self.page_images) > THUMBNAIL_CACHE_SIZE:
+                self.page_images.popitem(last=False)
+            # 選中的頁面還在等待完整預覽時，縮圖一到就先顯示
+            if page_num == self.preview_page and not self.preview_full and self.page_images[page_num]:
+                self.draw_preview(self.page_images[page_num])
+        self.root.after(50, self.poll_thumbnails, worker)
+    
+    def poll_previews(self, worker):
+        # 在主執行緒取出背景轉換好的完整預覽，丟棄已不是選中頁面的結果
+        if worker is not self.preview_worker:
+            return
+        while True:
+            try:
+                page_num, img, error = worker.results.get_nowait()
+            except queue.Empty:
+                break
+            if page_num != self.preview_page:
+                continue
+            if img is None:
+                # 顯示錯誤訊息
+                self.preview_canvas.delete("all")
+                self.preview_canvas.create_text(
+                    200, 200, text=f"無法顯示頁面 {page_num+1} 的預覽\n{error}"
+                )
+                continue
+            self.preview_full = True
+            self.draw_preview(ImageTk.PhotoImage(img))
+        self.root.after(30, self.poll_previews, worker)
+    
+    def draw_preview(self, img_tk):
+        # 在預覽畫布上顯示圖片
+        # 保存引用以防垃圾回收
+        self.current_preview = img_tk
+        
+        # 設定畫布大小
+        self.preview_canvas.delete("all")
+        self.preview_canvas.config(scrollregion=(0, 0, img_tk.width(), img_tk.height()))
+        self.preview_canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
     
     def update_page_list(self):
         # 更新頁面列表
@@ -335,42 +595,33 @@ class PDFReorderApp:
             self.selected_index = None
     
     def show_page_preview(self, index):
-        # 顯示選中頁面的預覽
+        # 顯示選中頁面的預覽：先顯示縮圖，完整解析度在背景轉換完成後替換
         if not self.current_pdf or index is None or index >= len(self.pages):
             return
         
-        # 清空預覽畫布
-        self.preview_canvas.delete("all")
-        
         # 獲取頁面號
         page_num = self.pages[index]
         
+        # 同一頁的完整預覽已顯示（例如只是上移/下移），不需重新轉換
+        if page_num == self.preview_page and self.preview_full:
+            return
+        
+        self.preview_page = page_num
+        self.preview_full = False
+        
         # 檢查是否有預覽圖
-        if index < len(self.page_images) and self.page_images[index]:
-            # 使用已加載的預覽圖
-            img = self.page_images[index]
-            self.preview_canvas.config(scrollregion=(0, 0, img.width(), img.height()))
-            self.preview_canvas.create_image(0, 0, anchor=tk.NW, image=img)
+        if self.page_images.get(page_num):
+            # 先使用已加載的縮圖
+            self.page_images.move_to_end(page_num)
+            self.draw_preview(self.page_images[page_num])
         else:
-            # 直接創建預覽
-            try:
-                page = self.current_pdf[page_num]
-                pix = page.get_pixmap(matrix=fitz.Matrix(1, 1))
-                img_data = pix.tobytes("ppm")
-                img = Image.open(io.BytesIO(img_data))
-                img_tk = ImageTk.PhotoImage(img)
-                
-                # 保存引用以防垃圾回收
-                self.current_preview = img_tk
+            # 清空預覽畫布
+            self.preview_canvas.delete("all")
+            self.preview_canvas.create_text(200, 200, text=f"正在載入頁面 {page_num+1} 的預覽...")
                 
-                # 設定畫布大小
-                self.preview_canvas.config(scrollregion=(0, 0, img.width, img.height))
-                self.preview_canvas.create_image(0, 0, anchor=tk.NW, image=img_tk)
-            except Exception as e:
-                # 顯示錯誤訊息
-                self.preview_canvas.create_text(
-                    200, 200, text=f"無法顯示頁面 {page_num+1} 的預覽\n{str(e)}"
-                )
+        # 取代尚未處理的請求；已在轉換中的舊頁面結果會在 poll_previews 丟棄
+        if self.preview_worker:
+            self.preview_worker.request([page_num])
     
     def move_page_up(self):
         # 將選中頁面上移
@@ -381,11 +632,6 @@ class PDFReorderApp:
         self.pages[self.selected_index], self.pages[self.selected_index-1] = \
             self.pages[self.selected_index-1], self.pages[self.selected_index]
         
-        # 更新預覽圖順序
-        if self.page_images:
-            self.page_images[self.selected_index], self.page_images[self.selected_index-1] = \
-                self.page_images[self.selected_index-1], self.page_images[self.selected_index]
-        
         # 更新頁面列表
         self.update_page_list()
         
@@ -407,11 +653,6 @@ class PDFReorderApp:
         self.pages[self.selected_index], self.pages[self.selected_index+1] = \
             self.pages[self.selected_index+1], self.pages[self.selected_index]
         
-        # 更新預覽圖順序
-        if self.page_images:
-            self.page_images[self.selected_index], self.page_images[self.selected_index+1] = \
-                self.page_images[self.selected_index+1], self.page_images[self.selected_index]
-        
         # 更新頁面列表
         self.update_page_list()
         
@@ -436,10 +677,6 @@ class PDFReorderApp:
         # 刪除頁面
         del self.pages[self.selected_index]
         
-        # 刪除預覽圖
-        if self.page_images:
-            del self.page_images[self.selected_index]
-        
         # 更新頁面列表
         self.update_page_list()
         
@@ -454,6 +691,8 @@ class PDFReorderApp:
             self.show_page_preview(self.selected_index)
         else:
             # 清空預覽
+            self.preview_page = None
+            self.preview_full = False
             self.preview_canvas.delete("all")
     
     def save_pdf(self):
@@ -473,16 +712,8 @@ class PDFReorderApp:
             return
         
         try:
-            # 創建新的 PDF 文件
-            new_pdf = fitz.open()
-            
-            # 按照新的順序加入頁面
-            for page_idx in self.pages:
-                new_pdf.insert_pdf(self.current_pdf, from_page=page_idx, to_page=page_idx)
-            
-            # 儲存 PDF
-            new_pdf.save(save_path)
-            new_pdf.close()
+            # 按照新的順序一次組出新文件並儲存
+            save_pages(self.current_pdf, self.pages, save_path)
             
             # 更新狀態
             self.status_var.set(f"已儲存: {os.path.basename(save_path)}")
@@ -516,66 +747,51 @@ class PDFReorderApp:
             messagebox.showinfo("提示", "沒有 PDF 檔案可分割")
             return
         
+        # 在背景執行緒分割，並以多個程序寫出檔案，介面保持可操作
+        progress = queue.Queue()
+        worker = threading.Thread(
+            target=self._run_split,
+            args=(progress, self.current_pdf.name, output_dir, prefix, mode, page_ranges, list(self.pages)),
+            daemon=True
+        )
+        worker.start()
+        self.status_var.set("正在分割 PDF...")
+        self.poll_split(progress, mode, output_dir)
+    
+    def _run_split(self, progress, pdf_path, output_dir, prefix, mode, page_ranges, page_order):
+        # 背景執行緒：不可直接操作 Tk，只透過佇列回報
         try:
-            # 取得原始檔案名稱（不含路徑和副檔名）
-            if hasattr(self.current_pdf, 'name'):
-                original_name = os.path.splitext(os.path.basename(self.current_pdf.name))[0]
-            else:
-                original_name = "document"
-            
-            # 根據模式分割 PDF
-            if mode == "each":
-                # 每頁分割為單獨 PDF
-                success_count = 0
-                for i, page_idx in enumerate(self.pages):
-                    # 創建新的 PDF 文件
-                    new_pdf = fitz.open()
-                    
-                    # 加入單頁
-                    new_pdf.insert_pdf(self.current_pdf, from_page=page_idx, to_page=page_idx)
-                    
-                    # 儲存 PDF
-                    output_path = os.path.join(output_dir, f"{prefix}{original_name}_page_{page_idx+1}.pdf")
-                    new_pdf.save(output_path)
-                    new_pdf.close()
-                    
-                    success_count += 1
-                
-                # 顯示成功訊息
-                messagebox.showinfo("成功", f"已將 PDF 分割為 {success_count} 個單頁檔案\n儲存至: {output_dir}")
-                
-            else:  # mode == "range"
-                # 按頁面範圍分割
-                success_count = 0
-                for i, (start, end) in enumerate(page_ranges):
-                    # 檢查頁面範圍
-                    valid_start = max(0, min(start, len(self.pages)-1))
-                    valid_end = max(valid_start, min(end, len(self.pages)-1))
-                    
-                    # 創建新的 PDF 文件
-                    new_pdf = fitz.open()
-                    
-                    # 加入頁面
-                    for page_idx in range(valid_start, valid_end + 1):
-                        real_idx = self.pages[page_idx]
-                        new_pdf.insert_pdf(self.current_pdf, from_page=real_idx, to_page=real_idx)
-                    
-                    # 儲存 PDF
-                    range_str = f"{start+1}-{end+1}" if start != end else f"{start+1}"
-                    output_path = os.path.join(output_dir, f"{prefix}{original_name}_pages_{range_str}.pdf")
-                    new_pdf.save(output_path)
-                    new_pdf.close()
-                    
-                    success_count += 1
-                
-                # 顯示成功訊息
-                messagebox.showinfo("成功", f"已將 PDF 分割為 {success_count} 個檔案\n儲存至: {output_dir}")
-            
-            # 更新狀態
-            self.status_var.set(f"已分割 PDF 至: {output_dir}")
-            
+            outputs = split_pdf(
+                pdf_path, output_dir, prefix, mode, page_ranges, page_order,
+                workers=0, progress_callback=lambda done, total: progress.put(("progress", done, total))
+            )
+            progress.put(("done", len(outputs), None))
         except Exception as e:
-            messagebox.showerror("錯誤", f"分割 PDF 時發生錯誤: {str(e)}")
+            progress.put(("error", str(e), None))
+    
+    def poll_split(self, progress, mode, output_dir):
+        # 在主執行緒更新分割進度
+        while True:
+            try:
+                kind, value, total = progress.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.status_var.set(f"正在分割 PDF... {value}/{total}")
+            elif kind == "done":
+                # 更新狀態
+                self.status_var.set(f"已分割 PDF 至: {output_dir}")
+                # 顯示成功訊息
+                if mode == "each":
+                    messagebox.showinfo("成功", f"已將 PDF 分割為 {value} 個單頁檔案\n儲存至: {output_dir}")
+                else:
+                    messagebox.showinfo("成功", f"已將 PDF 分割為 {value} 個檔案\n儲存至: {output_dir}")
+                return
+            else:
+                self.status_var.set("分割 PDF 失敗")
+                messagebox.showerror("錯誤", f"分割 PDF 時發生錯誤: {value}")
+                return
+        self.root.after(100, self.poll_split, progress, mode, output_dir)
 
 if __name__ == "__main__":
     # 創建主視窗
@@ -0,0 +1,177 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pdf_assemble import save_pages
+from pdf_io import is_path, open_document
+
+def parse_page_ranges(range_text):
+    """
+    解析頁面範圍字串，例如 "1-3,5,7-9"
+    
+    Returns:
+        list: [(start, end), ...]，從 0 開始的索引（包含 end）
+    """
+    page_ranges = []
+    parts = range_text.split(",")
+    
+    for part in parts:
+        part = part.strip()
+        if "-" in part:
+            # 處理範圍，例如 "1-3"
+            start, end = part.split("-")
+            start = int(start.strip())
+            end = int(end.strip())
+            if start < 1 or end < start:
+                raise ValueError(f"無效的頁面範圍: {part}")
+            page_ranges.append((start-1, end-1))  # 轉換為從 0 開始的索引
+        else:
+            # 處理單頁，例如 "5"
+            page = int(part.strip())
+            if page < 1:
+                raise ValueError(f"無效的頁面: {part}")
+            page_ranges.append((page-1, page-1))  # 轉換為從 0 開始的索引
+    
+    return page_ranges
+
+def plan_split(original_name, output_dir, prefix, mode, page_order, page_ranges=None):
+    """
+    計算每個輸出檔案的路徑與頁碼
+    
+    Args:
+        original_name (str): 原始檔名（不含路徑和副檔名）
+        output_dir (str): 輸出資料夾
+        prefix (str): 檔名前綴
+        mode (str): "each" 每頁一個檔案，"range" 每個範圍一個檔案
+        page_order (list): 目前的頁面順序（原始頁碼，從 0 開始）
+        page_ranges (list): mode="range" 時的範圍，索引對應 page_order 的位置
+    
+    Returns:
+        list: [(輸出路徑, [原始頁碼, ...]), ...]
+    """
+    jobs = []
+    if mode == "each":
+        for page_idx in page_order:
+            output_path = os.path.join(output_dir, f"{prefix}{original_name}_page_{page_idx+1}.pdf")
+            jobs.append((output_path, [page_idx]))
+    elif mode == "range":
+        for start, end in page_ranges:
+            # 檢查頁面範圍
+            valid_start = max(0, min(start, len(page_order)-1))
+            valid_end = max(valid_start, min(end, len(page_order)-1))
+            range_str = f"{start+1}-{end+1}" if start != end else f"{start+1}"
+            output_path = os.path.join(output_dir, f"{prefix}{original_name}_pages_{range_str}.pdf")
+            jobs.append((output_path, page_order[valid_start:valid_end + 1]))
+    else:
+        raise ValueError("分割模式必須是 'each' 或 'range'")
+    return jobs
+
+def _write_jobs(pdf_path, jobs):
+    """
+    開啟來源 PDF 一次，依序寫出多個輸出檔
+    
+    Returns:
+        list: 各輸出檔的路徑；輸出路徑為 None 時為 PDF bytes
+    """
+    source = open_document(pdf_path)
+    try:
+        # 一律從這批共用的文件 graft，select 每個輸出都要重新開啟來源文件；
+        # 連續的範圍只需一次 insert_pdf
+        return [save_pages(source, pages, output_path, method="graft") for output_path, pages in jobs]
+    finally:
+        if source is not pdf_path:
+            source.close()
+
+def split_pdf(pdf_path, output_dir, prefix="split_", mode="each", page_ranges=None,
+              page_order=None, workers=None, progress_callback=None):
+    """
+    分割 PDF 檔案，可用多個程序平行寫出
+    
+    記憶體中的來源一律在目前程序中處理，資料不複製到子程序。
+    
+    Args:
+        pdf_path (str | bytes | memoryview | mmap | file): 來源 PDF 檔案路徑或記憶體中的 PDF
+        output_dir (str, optional): 輸出資料夾，None 表示不寫檔、直接回傳各輸出的 PDF bytes
+        prefix (str): 檔名前綴
+        mode (str): "each" 每頁一個檔案，"range" 每個範圍一個檔案
+        page_ranges (list): mode="range" 時的範圍 [(start, end), ...]，從 0 開始
+        page_order (list, optional): 頁面順序（原始頁碼），預設為原始順序
+        workers (int, optional): 程序數，None 或 1 表示單程序，0 表示使用所有核心
+        progress_callback (callable, optional): 每完成一批呼叫 callback(已完成, 總數)
+    
+    Returns:
+        list: 已寫出的檔案路徑，或 output_dir 為 None 時各輸出的 PDF bytes
+    """
+    source = pdf_path
+    in_memory = not is_path(pdf_path)
+    if in_memory:
+        # 檔案物件只讀取 / 對應一次，之後各批共用同一份文件；呼叫端傳入的文件不會被關閉
+        pdf_path = open_document(pdf_path)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    if page_order is None:
+        doc = open_document(pdf_path)
+        page_order = list(range(doc.page_count))
+        if doc is not pdf_path:
+            doc.close()
+    
+    original_name = "document" if in_memory else os.path.splitext(os.path.basename(pdf_path))[0]
+    jobs = plan_split(original_name, output_dir or "", prefix, mode, page_order, page_ranges)
+    if output_dir is None:
+        jobs = [(None, pages) for _, pages in jobs]
+    total = len(jobs)
+    
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    if in_memory or output_dir is None or not workers or workers <= 1 or total <= 1:
+        # 單程序：每 50 個檔案回報一次進度
+        results = []
+        try:
+            for start in range(0, total, 50):
+                results += _write_jobs(pdf_path, jobs[start:start + 50])
+                if progress_callback:
+                    progress_callback(len(results), total)
+        finally:
+            if pdf_path is not source:
+                pdf_path.close()
+        return results
+    
+    # 每個 worker 分到數批，讓進度回報更平滑、負載更平均
+    batch_count = min(total, workers * 8)
+    batch_size = -(-total // batch_count)
+    batches = [jobs[i:i + batch_size] for i in range(0, total, batch_size)]
+    
+    done = 0
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        futures = [executor.submit(_write_jobs, pdf_path, batch) for batch in batches]
+        for future in as_completed(futures):
+            done += len(future.result())
+            if progress_callback:
+                progress_callback(done, total)
+    return [output_path for output_path, _ in jobs]
+
+def main():
+    parser = argparse.ArgumentParser(description="分割 PDF 檔案")
+    parser.add_argument("pdf", help="來源 PDF 檔案")
+    parser.add_argument("output_dir", help="輸出資料夾")
+    parser.add_argument("--mode", choices=("each", "range"), default="each", help="分割模式")
+    parser.add_argument("--ranges", help='頁面範圍，例如 "1-3,5,7-9"（mode=range 時使用）')
+    parser.add_argument("--prefix", default="split_", help="檔名前綴")
+    parser.add_argument("--workers", type=int, default=0, help="程序數，0 表示使用所有核心")
+    args = parser.parse_args()
+    
+    page_ranges = None
+    if args.mode == "range":
+        if not args.ranges:
+            parser.error("mode=range 時必須指定 --ranges")
+        page_ranges = parse_page_ranges(args.ranges)
+    
+    def report(done, total):
+        print(f"\r已完成 {done}/{total}", end="", flush=True)
+    
+    outputs = split_pdf(args.pdf, args.output_dir, args.prefix, args.mode, page_ranges,
+                        workers=args.workers, progress_callback=report)
+    print(f"\n已將 PDF 分割為 {len(outputs)} 個檔案\n儲存至: {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,13 +1,97 @@
 import fitz  # PyMuPDF
 import os
+from concurrent.futures import ProcessPoolExecutor
+from image_encoder import encode_pixmap
+from render_cache import file_hash
 
-def convert_pdf_to_jpg(pdf_path, output_folder=None):
+def _render_page(pdf_document, page_number, output_folder, pdf_filename, dpi=300, fmt="jpg",
+                 quality=None, colorspace="rgb", subsampling=None, progressive=False, optimize=False,
+                 cache=None, doc_hash=None):
+    """
+    轉換單一頁面並儲存
+    
+    若提供 cache (RenderCache) 與 doc_hash，命中時直接複製快取檔，不重新轉換。
+    
+    Returns:
+        str: 已儲存的圖片路徑
+    """
+    image_path = os.path.join(output_folder, f"{pdf_filename}_page_{page_number+1}.{fmt}")
+    
+    cache_key = None
+    if cache is not None and doc_hash is not None:
+        cache_key = cache.make_key(doc_hash, page_number, dpi/72, colorspace, fmt,
+                                   extra=(quality, subsampling, progressive, optimize))
+        if cache.copy_to(cache_key, image_path):
+            return image_path
+    
+    page = pdf_document.load_page(page_number)
+    cs = fitz.csGRAY if colorspace == "gray" else fitz.csRGB
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi/72, dpi/72), colorspace=cs)
+    encode_pixmap(pix, image_path, fmt=fmt, quality=quality, subsampling=subsampling,
+                  progressive=progressive, optimize=optimize)
+    
+    if cache_key is not None:
+        cache.put_file(cache_key, image_path)
+    return image_path
+
+def _render_page_range(pdf_path, output_folder, pdf_filename, start, end, render_kwargs):
+    """
+    在子程序中轉換 [start, end) 範圍內的頁面
+    
+    每個子程序自行開啟 fitz 文件，避免跨程序共用文件物件。
+    
+    Returns:
+        list: 已儲存的圖片路徑（依頁碼排序）
+    """
+    image_paths = []
+    pdf_document = fitz.open(pdf_path)
+    try:
+        for page_number in range(start, end):
+            image_paths.append(
+                _render_page(pdf_document, page_number, output_folder, pdf_filename, **render_kwargs)
+            )
+    finally:
+        pdf_document.close()
+    return image_paths
+
+def _split_page_ranges(first, last, workers):
+    """將 [first, last) 切成連續的區段，每個 worker 約分到數個區段以平衡負載"""
+    page_count = last - first
+    # 每個 worker 分到約 4 個區段，讓較慢的頁面不會拖住整批
+    chunk_count = min(page_count, workers * 4)
+    chunk_size, remainder = divmod(page_count, chunk_count)
+    ranges = []
+    start = first
+    for i in range(chunk_count):
+        end = start + chunk_size + (1 if i < remainder else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def convert_pdf_to_jpg(pdf_path, output_folder=None, workers=None, dpi=300, fmt="jpg",
+                       quality=None, colorspace="rgb", first_page=None, last_page=None,
+                       subsampling=None, progressive=False, optimize=False, cache=None):
     """
     Convert a PDF file to JPG images, one per page.
 
     Args:
         pdf_path (str): Path to the PDF file.
         output_folder (str, optional): Folder to save images. Defaults to PDF's folder.
+        workers (int, optional): Number of worker processes. ``None`` or 1 renders
+            serially; ``0`` uses ``os.cpu_count()``.
+        dpi (int): Output resolution.
+        fmt (str): Output format / file extension: "jpg", "webp" or "png".
+        quality (int, optional): JPEG/WebP quality; ``None`` uses the encoder default.
+        colorspace (str): "rgb" or "gray".
+        first_page (int, optional): First page to convert (1-based, inclusive).
+        last_page (int, optional): Last page to convert (1-based, inclusive).
+        subsampling (str, optional): JPEG chroma subsampling, e.g. "4:2:0".
+        progressive (bool): Write progressive JPEGs.
+        optimize (bool): Optimize JPEG Huffman tables / PNG compression.
+        cache (RenderCache, optional): Reuse previously rendered pages.
+    
+    Returns:
+        list: Saved image paths in page order.
     """
 
     # 如果沒有指定輸出資料夾，使用 PDF 所在的資料夾
@@ -20,30 +104,64 @@ def convert_pdf_to_jpg(pdf_path, output_folder=None):
     # 取得不含副檔名的 PDF 檔名
     pdf_filename = os.path.splitext(os.path.basename(pdf_path))[0]
     
+    render_kwargs = {
+        "dpi": dpi,
+        "fmt": fmt,
+        "quality": quality,
+        "colorspace": colorspace,
+        "subsampling": subsampling,
+        "progressive": progressive,
+        "optimize": optimize,
+    }
+    if cache is not None:
+        render_kwargs["cache"] = cache
+        render_kwargs["doc_hash"] = file_hash(pdf_path)
+    
     # 開啟 PDF 檔案
     pdf_document = fitz.open(pdf_path)
+    page_count = len(pdf_document)
+    
+    # 換算為從 0 開始的 [start, end) 範圍
+    start = max(0, (first_page or 1) - 1)
+    end = min(page_count, last_page or page_count)
+    
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    # 多程序模式：將頁面區段分給各個子程序，各自開啟 PDF
+    if workers and workers > 1 and end - start > 1:
+        pdf_document.close()
+        page_ranges = _split_page_ranges(start, end, workers)
+        image_paths = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(page_ranges))) as executor:
+            futures = [
+                executor.submit(_render_page_range, pdf_path, output_folder, pdf_filename,
+                                range_start, range_end, render_kwargs)
+                for range_start, range_end in page_ranges
+            ]
+            # 依提交順序收集結果，確保頁面順序與單程序模式一致
+            for future in futures:
+                for image_path in future.result():
+                    image_paths.append(image_path)
+                    print(f"已儲存 {image_path}")
+        return image_paths
+    
+    image_paths = []
     
     # 遍歷每一頁
-    for page_number in range(len(pdf_document)):
-        # 取得頁面
-        page = pdf_document.load_page(page_number)
-        
-        # 將頁面轉換為圖片 (設定解析度為 300dpi)
-        pix = page.get_pixmap(matrix=fitz.Matrix(300/72, 300/72))
-        
-        # 定義輸出路徑
-        image_path = os.path.join(output_folder, f"{pdf_filename}_page_{page_number+1}.jpg")
-        
-        # 儲存圖片
-        pix.save(image_path)
+    for page_number in range(start, end):
+        # 將頁面轉換為圖片並儲存 (預設解析度為 300dpi)
+        image_path = _render_page(pdf_document, page_number, output_folder, pdf_filename, **render_kwargs)
+        image_paths.append(image_path)
         print(f"已儲存 {image_path}")
     
     # 關閉 PDF 檔案
     pdf_document.close()
+    return image_paths
 
 # 使用範例
 if __name__ == "__main__":
     # 替換為你的 PDF 檔案路徑
-    pdf_file = r"C:\Users\"
+    pdf_file = r"C:\Users"
     convert_pdf_to_jpg(pdf_file)
     print("轉換完成！")
\ No newline at end of file
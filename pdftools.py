@@ -0,0 +1,270 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+def _run_compress(input_path, output_path, options):
+    from compress import compress_pdf_safe
+    return compress_pdf_safe(input_path, output_path, **options)
+
+def _run_ghostscript(input_path, output_path, options):
+    from ghostscript_compress import compress_pdf_with_ghostscript
+    return compress_pdf_with_ghostscript(input_path, output_path, **options)
+
+def _run_auto(input_path, output_path, options):
+    from pdf_analyze import compress_auto
+    return compress_auto(input_path, output_path, **options)
+
+def _run_images_to_pdf(input_path, output_path, options):
+    from images_to_pdf import convert_images_to_pdf
+    options = dict(options)
+    if "image_types" in options:
+        options["image_types"] = tuple(options["image_types"])
+    return convert_images_to_pdf(input_path, output_path, **options)
+
+def _run_combine(input_path, output_path, options):
+    from all_to_pdf import combine_to_pdf
+    options = dict(options)
+    if "image_types" in options:
+        options["image_types"] = tuple(options["image_types"])
+    return combine_to_pdf(input_path, output_path, **options)
+
+def _run_rasterize(input_path, output_path, options):
+    from rasterize import RasterOptions, rasterize_pdf
+    options = dict(options)
+    backend = options.pop("backend", "auto")
+    return rasterize_pdf(input_path, output_path, RasterOptions(**options), backend=backend)
+
+def _run_split(input_path, output_path, options):
+    from pdf_split import parse_page_ranges, split_pdf
+    options = dict(options)
+    if isinstance(options.get("page_ranges"), str):
+        options["page_ranges"] = parse_page_ranges(options["page_ranges"])
+    return split_pdf(input_path, output_path, **options)
+
+# 可用的工具：名稱 -> (執行函式, 輸入是否為單一檔案)
+TOOLS = {
+    "compress": (_run_compress, True),
+    "ghostscript": (_run_ghostscript, True),
+    "auto": (_run_auto, True),
+    "images_to_pdf": (_run_images_to_pdf, False),
+    "combine": (_run_combine, False),
+    "rasterize": (_run_rasterize, True),
+    "split": (_run_split, True),
+}
+
+# 輸出為單一檔案的工具，展開多個輸入時 output 視為資料夾
+_FILE_OUTPUT_TOOLS = ("compress", "ghostscript", "auto")
+
+def load_manifest(path):
+    """
+    讀取 JSON 或 YAML 工作清單
+    
+    清單格式:
+        {
+            "workers": 8,
+            "jobs": [
+                {"tool": "compress", "input": "in/*.pdf", "output": "out/",
+                 "options": {"compression_level": "high"}},
+                {"id": "scan-1", "tool": "rasterize", "input": "scan.pdf", "output": "images/"}
+            ]
+        }
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yml", ".yaml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("讀取 YAML 清單需要安裝 PyYAML: pip install pyyaml")
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+    
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("jobs"), list):
+        raise ValueError("工作清單必須包含 jobs 列表")
+    return manifest
+
+def _glob_root(pattern):
+    """萬用字元之前的目錄部分，例如 scans/**/*.pdf 的 scans"""
+    root = os.path.dirname(pattern)
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root or os.curdir
+
+def expand_jobs(jobs):
+    """
+    展開清單中的工作：input 含萬用字元時，每個符合的檔案成為一個工作
+    
+    輸出檔保留輸入相對於萬用字元前目錄的子資料夾結構，避免遞迴搜尋到的同名檔案
+    寫到同一個輸出；仍有多個工作寫到同一個輸出檔時擲出 ValueError。
+    
+    Returns:
+        list: [{"id", "tool", "input", "output", "options"}, ...]
+    """
+    expanded = []
+    for index, job in enumerate(jobs):
+        tool = job.get("tool")
+        if tool not in TOOLS:
+            raise ValueError(f"第 {index+1} 個工作的 tool 無效: {tool}，可用: {', '.join(TOOLS)}")
+        if "input" not in job:
+            raise ValueError(f"第 {index+1} 個工作缺少 input")
+        
+        input_pattern = job["input"]
+        output = job.get("output")
+        options = job.get("options", {})
+        base_id = job.get("id", f"{tool}:{os.path.abspath(input_pattern)}")
+        
+        if TOOLS[tool][1] and glob.has_magic(input_pattern):
+            root = _glob_root(input_pattern)
+            for input_path in sorted(glob.glob(input_pattern, recursive=True)):
+                job_output = output
+                if output and tool in _FILE_OUTPUT_TOOLS:
+                    job_output = os.path.join(output, os.path.relpath(input_path, root))
+                expanded.append({
+                    "id": f"{base_id}:{os.path.abspath(input_path)}",
+                    "tool": tool,
+                    "input": input_path,
+                    "output": job_output,
+                    "options": options,
+                })
+        else:
+            expanded.append({
+                "id": base_id,
+                "tool": tool,
+                "input": input_pattern,
+                "output": output,
+                "options": options,
+            })
+    
+    outputs = {}
+    for job in expanded:
+        if not job["output"] or job["tool"] not in _FILE_OUTPUT_TOOLS:
+            continue
+        key = os.path.normcase(os.path.abspath(job["output"]))
+        if key in outputs:
+            raise ValueError(f"多個工作輸出到同一個檔案: {job['output']} ({outputs[key]} 與 {job['input']})")
+        outputs[key] = job["input"]
+    return expanded
+
+def run_job(job, quiet=True):
+    """
+    執行單一工作並回傳結果（在子程序中執行）
+    
+    Returns:
+        dict: id、tool、input、output、status ("ok" 或 "error")、elapsed、error
+    """
+    run, _ = TOOLS[job["tool"]]
+    output = job["output"]
+    if output and job["tool"] in _FILE_OUTPUT_TOOLS:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    
+    result = {"id": job["id"], "tool": job["tool"], "input": job["input"], "output": output}
+    start = time.perf_counter()
+    try:
+        # 各工具會逐行列印進度，批次執行時預設隱藏
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log) if quiet else contextlib.nullcontext():
+            run(job["input"], output, job["options"])
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["elapsed"] = round(time.perf_counter() - start, 3)
+    return result
+
+def load_completed(state_path):
+    """讀取已成功完成的工作 id，用於中斷後繼續執行"""
+    completed = set()
+    if state_path and os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 上次中斷時可能留下寫到一半的最後一行
+                    continue
+                if record.get("status") == "ok":
+                    completed.add(record["id"])
+    return completed
+
+def run_manifest(manifest, workers=None, state_path=None, resume=True, quiet=True):
+    """
+    以程序池執行工作清單
+    
+    每個完成的工作立即以 JSON Lines 附加到 state_path，記錄狀態與耗時；
+    resume=True 時會略過 state_path 中已成功的工作。
+    
+    Args:
+        manifest (dict): load_manifest() 的結果
+        workers (int, optional): 程序數，預設使用清單中的 workers 或所有核心
+        state_path (str, optional): 狀態 / 報告檔路徑
+        resume (bool): 是否略過已完成的工作
+        quiet (bool): 是否隱藏各工具的輸出
+    
+    Returns:
+        list: 本次執行的結果
+    """
+    jobs = expand_jobs(manifest["jobs"])
+    workers = workers or manifest.get("workers") or os.cpu_count() or 1
+    
+    completed = load_completed(state_path) if resume else set()
+    pending = [job for job in jobs if job["id"] not in completed]
+    print(f"共 {len(jobs)} 個工作，略過已完成 {len(jobs) - len(pending)} 個，執行 {len(pending)} 個")
+    
+    results = []
+    state_file = open(state_path, "a", encoding="utf-8") if state_path else None
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_job, job, quiet): job for job in pending}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 子程序異常結束（例如崩潰）時也記錄為失敗
+                    result = {"id": job["id"], "tool": job["tool"], "input": job["input"],
+                              "output": job["output"], "status": "error",
+                              "error": f"{type(e).__name__}: {e}", "elapsed": None}
+                results.append(result)
+                if state_file:
+                    state_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    state_file.flush()
+                mark = "✅" if result["status"] == "ok" else "❌"
+                print(f"{mark} [{len(results)}/{len(pending)}] {result['tool']} {result['input']}"
+                      f" ({result['elapsed']} 秒){' ' + result['error'] if 'error' in result else ''}")
+    finally:
+        if state_file:
+            state_file.close()
+    
+    failed = sum(1 for r in results if r["status"] != "ok")
+    print(f"\n完成 {len(results) - failed} 個，失敗 {failed} 個，總耗時 {time.perf_counter() - start:.2f} 秒")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 工具批次執行")
+    parser.add_argument("manifest", help="JSON 或 YAML 工作清單")
+    parser.add_argument("--workers", type=int, help="程序數（預設: 清單設定或所有核心）")
+    parser.add_argument("--state", help="狀態 / 報告檔（JSON Lines），預設為 <清單>.state.jsonl")
+    parser.add_argument("--no-resume", action="store_true", help="不略過已完成的工作")
+    parser.add_argument("--verbose", action="store_true", help="顯示各工具的輸出")
+    args = parser.parse_args()
+    
+    manifest = load_manifest(args.manifest)
+    state_path = args.state or manifest.get("state") or f"{os.path.splitext(args.manifest)[0]}.state.jsonl"
+    results = run_manifest(manifest, args.workers, state_path, resume=not args.no_resume,
+                           quiet=not args.verbose)
+    if any(r["status"] != "ok" for r in results):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
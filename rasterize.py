@@ -0,0 +1,364 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import fitz  # PyMuPDF
+from image_encoder import encode_pixmap
+from pdf_io import is_path, open_document
+from pdf_to_jpg import convert_pdf_to_jpg as _pymupdf_convert
+from render_cache import file_hash
+
+class RasterOptions:
+    """
+    所有轉換引擎共用的參數
+    
+    Args:
+        dpi (int): 輸出解析度
+        fmt (str): 輸出格式，"jpg"、"webp" 或 "png"
+        quality (int, optional): JPEG / WebP 品質，None 使用引擎預設值
+        colorspace (str): "rgb" 或 "gray"
+        first_page (int, optional): 起始頁 (從 1 開始，包含)
+        last_page (int, optional): 結束頁 (從 1 開始，包含)
+        workers (int, optional): 平行程序數，None 或 1 表示單程序，0 表示使用所有核心
+        subsampling (str, optional): JPEG 色度取樣，例如 "4:2:0"
+        progressive (bool): 是否輸出漸進式 JPEG
+        optimize (bool): 是否最佳化 JPEG 霍夫曼表 / PNG 壓縮
+        cache (RenderCache, optional): 頁面轉換結果快取，命中時不重新轉換
+    """
+    def __init__(self, dpi=300, fmt="jpg", quality=None, colorspace="rgb",
+                 first_page=None, last_page=None, workers=None,
+                 subsampling=None, progressive=False, optimize=False, cache=None):
+        if fmt not in ("jpg", "webp", "png"):
+            raise ValueError("輸出格式必須是 'jpg'、'webp' 或 'png'")
+        if colorspace not in ("rgb", "gray"):
+            raise ValueError("色彩空間必須是 'rgb' 或 'gray'")
+        self.dpi = dpi
+        self.fmt = fmt
+        self.quality = quality
+        self.colorspace = colorspace
+        self.first_page = first_page
+        self.last_page = last_page
+        self.workers = workers
+        self.subsampling = subsampling
+        self.progressive = progressive
+        self.optimize = optimize
+        self.cache = cache
+    
+    def copy(self, **changes):
+        """回傳修改部分欄位後的新物件"""
+        values = dict(vars(self))
+        values.update(changes)
+        return RasterOptions(**values)
+
+# 已註冊的轉換引擎：名稱 -> 函式(pdf_path, output_folder, options) -> 圖片路徑列表
+BACKENDS = {}
+
+def register_backend(name):
+    """註冊轉換引擎的裝飾器"""
+    def decorator(func):
+        BACKENDS[name] = func
+        return func
+    return decorator
+
+def available_backends():
+    """回傳目前環境可用的引擎名稱"""
+    names = ["pymupdf"]
+    if shutil.which("pdftoppm"):
+        names.append("poppler")
+    return [name for name in names if name in BACKENDS]
+
+@register_backend("pymupdf")
+def render_with_pymupdf(pdf_path, output_folder, options):
+    """使用 PyMuPDF 轉換"""
+    return _pymupdf_convert(
+        pdf_path,
+        output_folder,
+        workers=options.workers,
+        dpi=options.dpi,
+        fmt=options.fmt,
+        quality=options.quality,
+        colorspace=options.colorspace,
+        first_page=options.first_page,
+        last_page=options.last_page,
+        subsampling=options.subsampling,
+        progressive=options.progressive,
+        optimize=options.optimize,
+        cache=options.cache
+    )
+
+def _run_pdftoppm(pdf_path, work_dir, first, last, options):
+    """以 pdftoppm 轉換 [first, last] 頁，回傳 {頁碼: 暫存檔路徑}"""
+    command = ["pdftoppm", "-r", str(options.dpi), "-f", str(first), "-l", str(last)]
+    if options.fmt == "jpg":
+        command.append("-jpeg")
+        jpeg_options = []
+        if options.quality is not None:
+            jpeg_options.append(f"quality={options.quality}")
+        if options.progressive:
+            jpeg_options.append("progressive=y")
+        if options.optimize:
+            jpeg_options.append("optimize=y")
+        if jpeg_options:
+            command += ["-jpegopt", ",".join(jpeg_options)]
+    else:
+        command.append("-png")
+    if options.colorspace == "gray":
+        command.append("-gray")
+    prefix = os.path.join(work_dir, f"p{first}")
+    subprocess.run(command + [pdf_path, prefix], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    # pdftoppm 輸出為 "<prefix>-<頁碼>.<副檔名>"，頁碼會補零
+    pattern = re.compile(rf"^p{first}-(\d+)\.(jpg|png)$")
+    pages = {}
+    for name in os.listdir(work_dir):
+        match = pattern.match(name)
+        if match:
+            pages[int(match.group(1))] = os.path.join(work_dir, name)
+    return pages
+
+@register_backend("poppler")
+def render_with_poppler(pdf_path, output_folder, options):
+    """使用 poppler (pdftoppm) 轉換，由 pdftoppm 直接寫出圖片檔"""
+    if not shutil.which("pdftoppm"):
+        raise FileNotFoundError("找不到 pdftoppm。請安裝 poppler 或改用 pymupdf 引擎。")
+    if options.fmt == "webp":
+        raise ValueError("poppler 引擎不支援 WebP 輸出")
+    
+    with fitz.open(pdf_path) as pdf_document:
+        page_count = pdf_document.page_count
+    first = max(1, options.first_page or 1)
+    last = min(page_count, options.last_page or page_count)
+    if first > last:
+        return []
+    
+    pdf_filename = os.path.splitext(os.path.basename(pdf_path))[0]
+    # 與 pymupdf 引擎相同：0 表示使用所有核心，None 表示單一程序
+    workers = options.workers
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = workers or 1
+    
+    def output_path(page_number):
+        return os.path.join(output_folder, f"{pdf_filename}_page_{page_number}.{options.fmt}")
+    
+    # 先從快取複製命中的頁面，只轉換缺少的頁面
+    cache_keys = {}
+    missing = list(range(first, last + 1))
+    if options.cache is not None:
+        doc_hash = file_hash(pdf_path)
+        extra = ("poppler", options.quality, options.progressive, options.optimize)
+        missing = []
+        for page_number in range(first, last + 1):
+            key = options.cache.make_key(doc_hash, page_number - 1, options.dpi/72,
+                                         options.colorspace, options.fmt, extra=extra)
+            cache_keys[page_number] = key
+            if not options.cache.copy_to(key, output_path(page_number)):
+                missing.append(page_number)
+    
+    # 將缺少的頁面分成連續區段，每段最多 chunk 頁，交給一個 pdftoppm 程序
+    ranges = []
+    if missing:
+        chunk = -(-len(missing) // min(workers, len(missing)))
+        for page_number in missing:
+            if ranges and ranges[-1][1] == page_number - 1 and ranges[-1][1] - ranges[-1][0] + 1 < chunk:
+                ranges[-1] = (ranges[-1][0], page_number)
+            else:
+                ranges.append((page_number, page_number))
+    
+    # 暫存資料夾放在輸出資料夾內，確保 os.replace 不會跨磁碟
+    work_dir = tempfile.mkdtemp(prefix=".pdftoppm_", dir=output_folder)
+    try:
+        rendered = {}
+        if ranges:
+            with ThreadPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+                results = executor.map(lambda r: _run_pdftoppm(pdf_path, work_dir, r[0], r[1], options), ranges)
+                for pages in results:
+                    rendered.update(pages)
+        
+        image_paths = []
+        for page_number in range(first, last + 1):
+            image_path = output_path(page_number)
+            if page_number in rendered:
+                os.replace(rendered[page_number], image_path)
+                if page_number in cache_keys:
+                    options.cache.put_file(cache_keys[page_number], image_path)
+            image_paths.append(image_path)
+            print(f"已儲存 {image_path}")
+        return image_paths
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+# 自動選擇引擎的結果快取：(路徑, 大小, 修改時間, dpi, 格式, 色彩空間) -> 引擎名稱
+_probe_cache = {}
+
+def probe_backend(pdf_path, options, candidates=None):
+    """
+    用第一頁試轉，回傳速度最快的引擎名稱
+    
+    Args:
+        pdf_path (str): PDF 檔案路徑
+        options (RasterOptions): 轉換參數
+        candidates (list, optional): 要比較的引擎，預設為所有可用引擎
+    """
+    candidates = candidates or available_backends()
+    if len(candidates) == 1:
+        return candidates[0]
+    
+    stat = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime, options.dpi, options.fmt, options.colorspace)
+    if key in _probe_cache:
+        return _probe_cache[key]
+    
+    page = options.first_page or 1
+    # 試轉時不使用快取，避免命中快取影響計時
+    probe_options = options.copy(first_page=page, last_page=page, workers=None, cache=None)
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix="raster_probe_") as probe_dir:
+        for name in candidates:
+            start = time.perf_counter()
+            try:
+                BACKENDS[name](pdf_path, probe_dir, probe_options)
+            except Exception as e:
+                print(f"引擎 {name} 試轉失敗: {e}")
+                continue
+            timings[name] = time.perf_counter() - start
+    
+    if not timings:
+        raise RuntimeError("沒有可用的轉換引擎")
+    best = min(timings, key=timings.get)
+    _probe_cache[key] = best
+    return best
+
+# 記憶體中的 PDF 平行轉換時，每個工作的頁數
+RASTER_CHUNK_PAGES = 8
+
+# 子程序中開啟的文件 (由 _init_raster_worker 設定)
+_worker_document = None
+
+def _encode_page(pdf_document, page_number, options):
+    """轉換單一頁面並編碼為圖片 bytes"""
+    cs = fitz.csGRAY if options.colorspace == "gray" else fitz.csRGB
+    pix = pdf_document.load_page(page_number).get_pixmap(
+        matrix=fitz.Matrix(options.dpi/72, options.dpi/72), colorspace=cs
+    )
+    return encode_pixmap(pix, fmt=options.fmt, quality=options.quality, subsampling=options.subsampling,
+                         progressive=options.progressive, optimize=options.optimize)
+
+def _init_raster_worker(source):
+    """子程序初始化：PDF 資料每個程序只傳送並開啟一次"""
+    global _worker_document
+    _worker_document = open_document(source)
+
+def _encode_page_range(start, end, options):
+    return [_encode_page(_worker_document, page_number, options) for page_number in range(start, end)]
+
+def rasterize_to_bytes(source, options=None):
+    """
+    以 PyMuPDF 轉換，圖片直接編碼到記憶體，不寫入任何檔案
+    
+    逐頁產生結果，呼叫端取走後即可釋放；options.workers 大於 1 時以多個程序
+    每次轉換 RASTER_CHUNK_PAGES 頁，處理中的頁數不超過 workers 的數倍。
+    
+    Args:
+        source: PDF 檔案路徑、記憶體中的 PDF (bytes、memoryview、mmap、檔案物件) 或已開啟的文件
+        options (RasterOptions, optional): 轉換參數，cache 不使用
+    
+    Yields:
+        bytes: 各頁圖片（依頁碼順序）
+    """
+    options = options or RasterOptions()
+    pdf_document = open_document(source)
+    try:
+        first = max(0, (options.first_page or 1) - 1)
+        last = min(options.last_page or pdf_document.page_count, pdf_document.page_count)
+        workers = options.workers
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        
+        if not workers or workers <= 1 or last - first <= 1:
+            for page_number in range(first, last):
+                yield _encode_page(pdf_document, page_number, options)
+            return
+        
+        # 子程序需要可序列化的來源：路徑直接傳送，其他來源傳送一份 PDF bytes
+        if is_path(source):
+            worker_source = source
+        elif pdf_document.stream is not None and not pdf_document.is_dirty:
+            worker_source = bytes(pdf_document.stream)
+        else:
+            worker_source = pdf_document.tobytes()
+        ranges = [(start, min(start + RASTER_CHUNK_PAGES, last))
+                  for start in range(first, last, RASTER_CHUNK_PAGES)]
+        range_iter = iter(ranges)
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), initializer=_init_raster_worker,
+                                 initargs=(worker_source,)) as executor:
+            pending = deque()
+            for start, end in range_iter:
+                pending.append(executor.submit(_encode_page_range, start, end, options))
+                if len(pending) >= workers * 2:
+                    break
+            # 依順序取出結果，每取出一批就補送一批
+            while pending:
+                images = pending.popleft().result()
+                next_range = next(range_iter, None)
+                if next_range is not None:
+                    pending.append(executor.submit(_encode_page_range, *next_range, options))
+                yield from images
+    finally:
+        if pdf_document is not source:
+            pdf_document.close()
+
+def rasterize_pdf(pdf_path, output_folder=None, options=None, backend="auto"):
+    """
+    將 PDF 轉換為圖片，可選擇轉換引擎
+    
+    記憶體中的 PDF 一律以 PyMuPDF 轉換 (見 rasterize_to_bytes)。
+    
+    Args:
+        pdf_path (str | bytes | memoryview | mmap | file): PDF 檔案路徑或記憶體中的 PDF
+        output_folder (str, optional): 輸出資料夾 (預設: 與 PDF 相同資料夾；
+            記憶體中的 PDF 未指定時回傳逐頁產生圖片 bytes 的產生器)
+        options (RasterOptions, optional): 轉換參數
+        backend (str): "auto" 或已註冊的引擎名稱 ("pymupdf", "poppler")
+    
+    Returns:
+        list: 已儲存的圖片路徑（依頁碼順序），或圖片 bytes 的產生器
+    """
+    options = options or RasterOptions()
+    if not is_path(pdf_path):
+        images = rasterize_to_bytes(pdf_path, options)
+        if output_folder is None:
+            return images
+        # 每頁編碼完成就寫出，不在記憶體累積
+        os.makedirs(output_folder, exist_ok=True)
+        image_paths = []
+        for index, data in enumerate(images):
+            image_path = os.path.join(output_folder, f"document_page_{(options.first_page or 1) + index}.{options.fmt}")
+            with open(image_path, "wb") as f:
+                f.write(data)
+            image_paths.append(image_path)
+            print(f"已儲存 {image_path}")
+        return image_paths
+    
+    if output_folder is None:
+        output_folder = os.path.dirname(pdf_path)
+    os.makedirs(output_folder, exist_ok=True)
+    
+    if backend == "auto":
+        backend = probe_backend(pdf_path, options)
+        print(f"自動選擇引擎: {backend}")
+    elif backend not in BACKENDS:
+        raise ValueError(f"未知的轉換引擎: {backend}，可用: {', '.join(BACKENDS)}")
+    
+    return BACKENDS[backend](pdf_path, output_folder, options)
+
+# 使用範例
+if __name__ == "__main__":
+    # 替換為你的 PDF 檔案路徑
+    pdf_file = "example.pdf"
+    rasterize_pdf(pdf_file, options=RasterOptions(dpi=200, quality=85))
+    print("轉換完成！")
\ No newline at end of file
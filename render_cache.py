@@ -0,0 +1,180 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+# 預設快取大小上限 (1 GB)
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+def default_cache_dir():
+    """回傳預設的快取資料夾（Windows 使用 LOCALAPPDATA，其他系統使用 ~/.cache）"""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pdf_tools", "renders")
+
+# 檔案雜湊快取：(絕對路徑, 大小, 修改時間) -> sha256
+_hash_memo = {}
+
+def file_hash(path):
+    """
+    計算檔案內容的 sha256，同一個未修改的檔案只計算一次
+    
+    Args:
+        path (str): 檔案路徑
+    
+    Returns:
+        str: 十六進位雜湊值
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _hash_memo:
+        return _hash_memo[memo_key]
+    
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+class RenderCache:
+    """
+    以內容定址的頁面轉換結果快取
+    
+    鍵值由 (PDF 內容雜湊, 頁碼, 縮放比例, 色彩空間, 格式, 其他編碼參數) 組成，
+    每個項目是資料夾中的一個圖片檔。命中時更新修改時間，超過大小上限時
+    依修改時間刪除最久未使用的項目 (LRU)。
+    
+    Args:
+        cache_dir (str, optional): 快取資料夾，預設為 default_cache_dir()
+        max_bytes (int): 快取大小上限
+    """
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes = None
+    
+    def __getstate__(self):
+        # 傳給子程序時不帶鎖，子程序重新建立
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(doc_hash, page_index, scale, colorspace="rgb", fmt="png", extra=()):
+        """
+        產生快取鍵值
+        
+        Args:
+            doc_hash (str): PDF 內容雜湊 (見 file_hash)
+            page_index (int): 頁碼 (從 0 開始)
+            scale (float): 轉換矩陣的縮放比例 (dpi / 72)
+            colorspace (str): 色彩空間
+            fmt (str): 圖片格式 / 副檔名
+            extra (tuple): 其他會影響輸出的參數，例如 JPEG 品質
+        """
+        raw = f"{doc_hash}|{page_index}|{scale:.6f}|{colorspace}|{fmt}|{extra!r}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest() + "." + fmt
+    
+    def _path(self, key):
+        # 以前兩碼分子資料夾，避免單一資料夾檔案過多
+        return os.path.join(self.cache_dir, key[:2], key)
+    
+    def get(self, key):
+        """命中時回傳快取檔路徑並標記為最近使用，否則回傳 None"""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+    
+    def copy_to(self, key, destination):
+        """命中時把快取檔複製到 destination 並回傳 True"""
+        path = self.get(key)
+        if path is None:
+            return False
+        try:
+            shutil.copyfile(path, destination)
+        except OSError:
+            return False
+        return True
+    
+    def put_bytes(self, key, data):
+        """寫入快取項目並回傳其路徑"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先寫入暫存檔再改名，避免其他程序讀到寫一半的檔案
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._added(len(data))
+        return path
+    
+    def put_file(self, key, source_path):
+        """將已存在的圖片檔複製進快取並回傳其路徑"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, path)
+        self._added(os.path.getsize(path))
+        return path
+    
+    def _entries(self):
+        """列出所有快取項目 (修改時間, 大小, 路徑)"""
+        entries = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+    
+    def _added(self, size):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        # 刪除最久未使用的項目，直到低於上限的 90%
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+    
+    def clear(self):
+        """清空快取"""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
\ No newline at end of file